@@ -1,28 +1,137 @@
 # agents/classifier_agent.py
+import random
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Union
+from core import config, deadline
+from core.classification_cache import ClassificationCache
 from core.llm_client import LLMClient
+from core.local_classifier import LocalClassifier, get_local_classifier
 
 class ClassifierAgent:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, local_classifier: Optional[LocalClassifier] = None,
+                 cache: Optional[ClassificationCache] = None):
         self.llm = llm_client
+        self.categories = config.NEWS_CATEGORIES
+        # Articles classified before (by content, not URL) are answered from the cache.
+        self.cache = cache or ClassificationCache(self.categories)
+        # First tier: a local model answers when it is confident; everything else escalates to the LLM.
+        self.local = local_classifier or get_local_classifier()
+        self._stats_lock = threading.Lock()
+        self.stats = {"cached": 0, "local": 0, "llm": 0, "audits": 0, "escalated_agreed": 0, "escalated_disagreed": 0}
+        # Outcomes of recent confident local predictions that were checked against the LLM.
+        self._audits = deque(maxlen=100)
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _audited_precision(self) -> Optional[float]:
+        with self._stats_lock:
+            if len(self._audits) < config.LOCAL_CLASSIFIER_MIN_AUDITS:
+                return None
+            return sum(self._audits) / len(self._audits)
+
+    def _local_tier_trusted(self) -> bool:
+        precision = self._audited_precision()
+        return precision is None or precision >= config.LOCAL_CLASSIFIER_MIN_PRECISION
+
+    def _classify_with_llm(self, title: str, summary: str) -> Optional[str]:
+        """Returns the LLM's category, or None if the call failed or the reply names no known category."""
+        prompt = f"Please classify the following news article into one of these categories: {', '.join(self.categories)}.\n\nTitle: {title}\nSummary: {summary}"
 
-    def classify(self, title: str, summary: str) -> str:
-        """Classifies an article based on its title and summary."""
-        print(f"[ClassifierAgent] Classifying: {title}")
-        prompt = f"Please classify the following news article into one of these categories: Politics, Technology, Sports, Finance, Entertainment, World, Health.\n\nTitle: {title}\nSummary: {summary}"
-        
         # The LLM might return extra text, so we try to find the category from a list.
         raw_classification = self.llm.chat(prompt)
-        categories = ["Politics", "Technology", "Sports", "Finance", "Entertainment", "World", "Health"]
-        for cat in categories:
+        if raw_classification is None:
+            return None
+        for cat in self.categories:
             if cat.lower() in raw_classification.lower():
                 return cat
-        return "General"
+        return None
+
+    def classify(self, title: str, summary: str) -> Optional[str]:
+        """Classifies an article based on its title and summary; None if the LLM could not answer in time."""
+        print(f"[ClassifierAgent] Classifying: {title}")
+        return self.classify_batch([{"title": title, "summary": summary}])[0]
+
+    def classify_batch(self, articles: List[dict]) -> List[Optional[str]]:
+        """
+        Classifies several articles (dicts with 'title' and 'summary'). Each one is answered by
+        the first tier that can: the cache, then the local model in one vectorized pass, then the LLM.
+        Articles the LLM could not answer (an error, or the run's deadline passed) get None.
+        """
+        pairs = [(article.get("title"), article.get("summary")) for article in articles]
+        categories = self.cache.get_many(pairs)
+        misses = [i for i, category in enumerate(categories) if category is None]
+        with self._stats_lock:
+            self.stats["cached"] += len(articles) - len(misses)
+
+        predictions = self.local.predict([pairs[i] for i in misses])
+        learned = []
+        for i, (local_category, confidence) in zip(misses, predictions):
+            title, summary = pairs[i]
+            confident = bool(local_category) and confidence >= config.LOCAL_CLASSIFIER_THRESHOLD
+            # A sample of confident answers is still checked by the LLM; while the checked precision
+            # is too low, every answer is checked.
+            audit = confident and (not self._local_tier_trusted() or random.random() < config.LOCAL_CLASSIFIER_AUDIT_RATE)
+            if confident and not audit:
+                print(f"[ClassifierAgent] Local model: {local_category} ({confidence:.2f}) for {title}")
+                self._count("local")
+                categories[i] = local_category
+                continue
+
+            # Out of time, or the LLM failed: an audited article keeps its local answer, any
+            # other is left unclassified (None) for the caller to retry in a later run.
+            category = None if deadline.expired() else self._classify_with_llm(title, summary)
+            if category is None:
+                categories[i] = local_category if confident else None
+                continue
+            self._count("llm")
+            if audit:
+                self._count("audits")
+                with self._stats_lock:
+                    self._audits.append(local_category == category)
+            if local_category:
+                # How often the local guess would have been right, to help tune the threshold.
+                self._count("escalated_agreed" if local_category == category else "escalated_disagreed")
+            categories[i] = category
+            learned.append((title, summary, category))
+
+        # Every LLM answer becomes training data for the local tier and is cached; local answers
+        # are cheap to recompute and not cached, so a later, better model can revise them.
+        self.local.learn(learned)
+        self.cache.set_many(learned)
+        return categories
+
+    def report(self) -> Dict:
+        """How many classifications the local tier answered, and how many LLM calls that saved."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = stats["cached"] + stats["local"] + stats["llm"]
+        escalated_with_guess = stats["escalated_agreed"] + stats["escalated_disagreed"]
+        return {
+            **stats,
+            "total": total,
+            "llm_calls_saved": stats["cached"] + stats["local"],
+            "saved_ratio": round((stats["cached"] + stats["local"]) / total, 3) if total else 0.0,
+            "escalated_agreement": round(stats["escalated_agreed"] / escalated_with_guess, 3) if escalated_with_guess else None,
+            "audited_precision": self._audited_precision(),
+            "local_tier_trusted": self._local_tier_trusted(),
+            "local_model_samples": self.local.num_samples,
+            "threshold": config.LOCAL_CLASSIFIER_THRESHOLD,
+            "cache": self.cache.stats(),
+        }
 
-    def receive(self, article_info: dict) -> str:
-        """Receives a dictionary with 'title' and 'summary' to start classification."""
+    def receive(self, article_info: Union[dict, List[dict]]) -> Union[Optional[str], List[Optional[str]]]:
+        """
+        Receives a dictionary with 'title' and 'summary' to start classification,
+        or a list of them to classify as a batch.
+        """
         print(f"[ClassifierAgent] Received classification task...")
+        if isinstance(article_info, list):
+            return self.classify_batch(article_info)
         title = article_info.get('title')
         summary = article_info.get('summary')
         if not title or not summary:
             return "Error: Title or summary missing."
-        return self.classify(title, summary)
\ No newline at end of file
+        return self.classify(title, summary)
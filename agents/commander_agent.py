@@ -1,63 +1,630 @@
 
 # agents/commander_agent.py
-from typing import List
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+from core import config, deadline
 from core.a2a_bus import A2ABus
+from core.checkpoints import CheckpointStore, PendingArticles, get_checkpoint_store, get_pending_articles
+from core.dag_executor import DagExecutor, StageHandler, StopPipeline
+from core.executors import get_executor
+from core.messages import RankRequest, RankResponse, StoreRequest
 from core.news_article import NewsArticle
+from core.og_image import get_og_image_extractor
+from core.popularity import parse_published
+from core.seen_index import SeenIndex, get_seen_index
+from core.near_dup import DuplicateGroup, NearDuplicateDetector, get_near_duplicate_detector
+from core.story_clusters import StoryClusterer, get_story_clusterer
+from core.url_utils import canonicalize_url
+
+# The category of an article that has not been classified yet.
+_UNCATEGORIZED = NewsArticle.model_fields["category"].default
+
+class PipelineRun:
+    """The state of one batch pipeline run, shared by its stages and checkpointed between them."""
+    def __init__(self, topics: List[str], run_id: Optional[str] = None):
+        self.topics = topics
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self.raw_articles: List[Dict] = []
+        self.articles: List[NewsArticle] = []
+        self.new_articles: List[NewsArticle] = []
+        self.groups: List[DuplicateGroup] = []
+        self.result: Optional[Dict] = None
+        self.completed: List[str] = []
+        self.stop_requested = threading.Event()
+        # Set once the final store begins; batches abandoned at a deadline publish nothing after that.
+        self.finished = False
+        self.publish_lock = threading.Lock()
+        # A resumed run gets a fresh budget.
+        budget = config.PIPELINE_RUN_BUDGET_SECONDS
+        self.deadline = deadline.Deadline(budget) if budget else None
+
+    def add_raw_articles(self, topic: str, raw_articles: List[Dict]):
+        with self._lock:
+            self.raw_articles.extend({**raw_article, "topic": topic} for raw_article in raw_articles)
+
+    def positions(self) -> Dict[str, int]:
+        return {article.id: i for i, article in enumerate(self.articles)}
+
+    def to_state(self) -> Dict:
+        """Everything but the articles themselves, which are checkpointed row by row."""
+        state = {"completed": list(self.completed)}
+        if "prepare" in self.completed:
+            state["new_ids"] = [article.id for article in self.new_articles]
+            state["groups"] = [
+                {"representative": g.representative.id, "duplicates": [d.id for d in g.duplicates],
+                 "archive_category": g.archive_category}
+                for g in self.groups
+            ]
+        else:
+            state["raw_articles"] = self.raw_articles
+        return state
+
+    @classmethod
+    def restore(cls, stored: Dict) -> "PipelineRun":
+        """Rebuilds a run from CheckpointStore.load_run()."""
+        run = cls(stored["topics"], stored["run_id"])
+        state = stored["state"]
+        run.completed = state.get("completed", [])
+        run.raw_articles = state.get("raw_articles", [])
+        run.articles = stored["articles"]
+        by_id = {article.id: article for article in run.articles}
+        run.new_articles = [by_id[i] for i in state.get("new_ids", []) if i in by_id]
+        for stored_group in state.get("groups", []):
+            group = DuplicateGroup(by_id[stored_group["representative"]])
+            group.duplicates = [by_id[i] for i in stored_group["duplicates"] if i in by_id]
+            group.archive_category = stored_group["archive_category"]
+            run.groups.append(group)
+        return run
 
 class CommanderAgent:
-    def __init__(self, a2a_bus: A2ABus):
+    def __init__(
+        self,
+        a2a_bus: A2ABus,
+        seen_index: Optional[SeenIndex] = None,
+        near_duplicates: Optional[NearDuplicateDetector] = None,
+        stories: Optional[StoryClusterer] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+        pending: Optional[PendingArticles] = None,
+    ):
         self.a2a_bus = a2a_bus
+        self.seen_index = seen_index or get_seen_index()
+        self.near_duplicates = near_duplicates or get_near_duplicate_detector()
+        self.stories = stories or get_story_clusterer()
+        # Batch mode runs the stages declared in config.PIPELINE_DAG, checkpointing as it goes.
+        self.dag = DagExecutor.from_config(config.PIPELINE_DAG, self._stage_handlers())
+        self.checkpoints = checkpoints or (get_checkpoint_store() if config.CHECKPOINT_ENABLED else None)
+        # Checkpointed runs are owned by the process executing them (see CheckpointStore). Host and
+        # pid repeat across container restarts, so the id also carries a per-process random part.
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._resume_lock = threading.Lock()
+        self._active_runs: Dict[str, PipelineRun] = {}
+        self.pending = pending or get_pending_articles()
+        self._runs_lock = threading.Lock()
+
+    def _build_articles(self, raw_articles: List[Dict]) -> List[NewsArticle]:
+        """
+        Builds one article per canonical URL. An article found by several topics' crawls is
+        processed once and tagged with all of them.
+        """
+        articles: Dict[str, NewsArticle] = {}
+        for raw_article in raw_articles:
+            key = canonicalize_url(raw_article['url'])
+            article = articles.get(key)
+            if article is None:
+                article = articles[key] = NewsArticle(
+                    title=raw_article['title'],
+                    url=raw_article['url'],
+                    source=raw_article.get('source'),
+                    published_at=parse_published(raw_article.get('published')),
+                    summary=raw_article.get('summary', 'No summary available.') # Get summary from crawler
+                )
+            topic = raw_article.get('topic')
+            if topic and topic not in article.topics:
+                article.topics.append(topic)
+        if len(articles) < len(raw_articles):
+            print(f"[CommanderAgent] {len(raw_articles)} crawled articles → {len(articles)} unique URLs.")
+        return list(articles.values())
+
+    def _add_pending(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        """
+        Adds the articles earlier runs left pending. A pending article that was crawled again
+        replaces the fresh copy, so the work already done on it is kept.
+        """
+        carried = self.pending.take()
+        if not carried:
+            return articles
+        by_url = {canonicalize_url(article.url): article for article in articles}
+        for article in carried:
+            key = canonicalize_url(article.url)
+            if key in by_url:
+                article.topics = list(dict.fromkeys(article.topics + by_url[key].topics))
+            article.pending = []
+            by_url[key] = article
+        print(f"[CommanderAgent] Picked up {len(carried)} articles left pending by earlier runs.")
+        return list(by_url.values())
+
+    @staticmethod
+    def _mark_pending(articles: List[NewsArticle]) -> List[NewsArticle]:
+        """Records which steps each new article still lacks and returns the ones lacking any."""
+        for article in articles:
+            article.pending = [
+                step for step, missing in (
+                    ("classify", article.category == _UNCATEGORIZED),
+                    ("rank", article.ranked_at is None),
+                ) if missing
+            ]
+        return [article for article in articles if article.pending]
+
+    def _apply_known(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        """Articles seen in an earlier run keep their stored id, category and summary. Returns the new ones."""
+        known = self.seen_index.lookup_many([article.url for article in articles])
+        for article in articles:
+            record = known.get(article.url)
+            if record:
+                article.id = record["article_id"]
+                article.category = record["category"]
+                article.summary = record["summary"] or article.summary
+                article.image = record["image"]
+                # Already ranked: the stored score is kept and decays at query time.
+                article.popularity = record["popularity"] or 0
+                article.ranked_at = record["first_seen"]
+        new_articles = [article for article in articles if article.url not in known]
+        print(f"[CommanderAgent] {len(known)} articles already known, {len(new_articles)} new.")
+        return new_articles
+
+    @staticmethod
+    def _link_duplicates(group: DuplicateGroup):
+        group.representative.duplicate_count = len(group.duplicates)
+        for duplicate in group.duplicates:
+            duplicate.duplicate_of = group.representative.id
+
+    @staticmethod
+    def _apply_category(group: DuplicateGroup, category: Optional[str]):
+        # No category (the classifier ran out of time or failed) leaves the group pending.
+        if not category:
+            return
+        for member in group.members:
+            member.category = category
+
+    @staticmethod
+    def _apply_ranking(articles: List[NewsArticle], ranking: RankResponse):
+        ranked_at = time.time()
+        for article in articles:
+            if article.id in ranking.scores:
+                article.popularity = ranking.scores[article.id]
+                article.ranked_at = ranked_at
+        if not ranking.complete:
+            print(f"[CommanderAgent] Ranking was partial: {len(ranking.missing)} articles got no score.")
+
+    def _print_classifier_report(self):
+        classifier = self.a2a_bus.agents.get("classifier_agent")
+        if classifier is not None and hasattr(classifier, "report"):
+            print(f"[CommanderAgent] Classifier report: {classifier.report()}")
+
+    def _stage_handlers(self) -> Dict[str, StageHandler]:
+        """The stage implementations that config.PIPELINE_DAG can refer to."""
+        return {
+            "crawl": StageHandler(self._crawl, items=lambda run: run.topics),
+            "prepare": StageHandler(self._prepare),
+            # Classify and rank select only unfinished items, so a resumed run continues where it stopped.
+            "classify": StageHandler(self._classify, items=lambda run: [
+                g for g in run.groups if not g.archive_category and g.representative.category == _UNCATEGORIZED
+            ]),
+            "images": StageHandler(self._lookup_images_sync, items=lambda run: [a for a in run.articles if not a.image]),
+            "stories": StageHandler(lambda run, batch, receiver: self.stories.assign(run.articles)),
+            "rank": StageHandler(self._rank, items=lambda run: [a for a in run.new_articles if a.ranked_at is None]),
+            "store": StageHandler(self._store),
+            "remember": StageHandler(self._remember),
+        }
+
+    # --- Stage implementations: each gets the run, its batch of items (or None) and its receiver ---
+
+    def _crawl(self, run: "PipelineRun", topics: List[str], receiver: str):
+        for topic in topics:
+            run.add_raw_articles(topic, self.a2a_bus.send("commander_agent", receiver, topic) or [])
+
+    def _prepare(self, run: "PipelineRun", batch, receiver):
+        # The crawler also provides a summary; articles seen before keep their stored fields.
+        run.articles = self._add_pending(self._build_articles(run.raw_articles))
+        if not run.articles:
+            raise StopPipeline("No articles found")
+        run.new_articles = self._apply_known(run.articles)
+        # Near-duplicates (the same story from several outlets) share one classification.
+        run.groups = self.near_duplicates.group(run.new_articles)
+        for group in run.groups:
+            self._link_duplicates(group)
+            if group.archive_category:
+                self._apply_category(group, group.archive_category)
+        # Known articles are complete already; new ones are listed as pending until they are.
+        self._mark_pending(run.new_articles)
+        new_ids = {article.id for article in run.new_articles}
+        self._publish(run, [article for article in run.articles if article.id not in new_ids])
+
+    def _classify(self, run: "PipelineRun", groups: List[DuplicateGroup], receiver: str):
+        # Each batch of representatives is classified with a single bus message.
+        print(f"[CommanderAgent] Classifying {len(groups)} article groups...")
+        categories = self.a2a_bus.send(
+            sender="commander_agent",
+            receiver=receiver,
+            message=[{"title": g.representative.title, "summary": g.representative.summary} for g in groups],
+        )
+        for group, category in zip(groups, categories):
+            self._apply_category(group, category)
+        members = [member for group in groups for member in group.members]
+        self._mark_pending(members)
+        self._publish(run, members)
+
+    def _lookup_images_sync(self, run: "PipelineRun", articles: List[NewsArticle], receiver):
+        images = get_og_image_extractor().lookup_many([article.url for article in articles])
+        for article in articles:
+            article.image = article.image or images.get(article.url)
+        self._publish(run, [article for article in articles if article.image], fields=["image"])
+
+    def _rank(self, run: "PipelineRun", articles: List[NewsArticle], receiver: str):
+        # Only new articles are ranked; known ones keep their earlier score.
+        ranking: RankResponse = self.a2a_bus.send("commander_agent", receiver, RankRequest(articles=articles))
+        self._apply_ranking(articles, ranking)
+        self._mark_pending(articles)
+        self._publish(run, articles, fields=["popularity", "ranked_at", "pending"])
+
+    def _publish(self, run: "PipelineRun", articles: List[NewsArticle], fields: Optional[List[str]] = None):
+        """
+        Upserts finished work as soon as a stage batch is done, so /api/news shows it before the
+        run ends. A failed write only delays the articles until the store stage. Once the run has
+        finished, nothing is written, so a late batch cannot overwrite the final state.
+        """
+        if not articles:
+            return
+        with run.publish_lock:
+            if run.finished:
+                print(f"[CommanderAgent] Run already finished; dropped a late write of {len(articles)} articles.")
+                return
+            try:
+                self.a2a_bus.send(
+                    "commander_agent", "storage_agent", StoreRequest(articles=articles, upsert=True, fields=fields)
+                )
+            except Exception as e:
+                print(f"[CommanderAgent] Progressive write of {len(articles)} articles failed: {e}")
+
+    @staticmethod
+    def _finish(run: "PipelineRun"):
+        # Waits for a progressive write in flight, so none lands after the final store.
+        with run.publish_lock:
+            run.finished = True
+
+    def _store(self, run: "PipelineRun", batch, receiver: str):
+        # Whatever was finished is stored; the rest is marked pending for the next run. Articles
+        # were upserted as their stages finished; this final upsert writes their complete state.
+        self._finish(run)
+        self._mark_pending(run.new_articles)
+        run.result = self.a2a_bus.send("commander_agent", receiver, StoreRequest(articles=run.articles, upsert=True))
+
+    def _remember(self, run: "PipelineRun", batch, receiver):
+        self._remember_articles(run.articles, {article.id for article in run.new_articles})
+
+    def _remember_articles(self, articles: List[NewsArticle], new_ids: set):
+        """Finished articles go into the seen index; pending ones are queued for the next run instead."""
+        finished = [article for article in articles if not article.pending]
+        self.seen_index.remember(finished)
+        self.near_duplicates.add([article for article in finished if article.id in new_ids])
+        pending = [article for article in articles if article.pending]
+        if pending:
+            self.pending.add(pending)
+            print(f"[CommanderAgent] {len(pending)} articles left pending for the next run.")
 
     def start_pipeline(self, topic: str):
-        print(f"[CommanderAgent] Pipeline started for topic: '{topic}'")
+        return self.run_topics([topic])
 
-        # 1. Crawl for raw articles
-        raw_articles = self.a2a_bus.send("commander_agent", "crawler_agent", topic)
-        if not raw_articles:
+    def run_topics(self, topics: List[str], run_id: Optional[str] = None):
+        """
+        Runs the pipeline for several topics at once: all topics are crawled concurrently, and
+        the combined articles are deduplicated and classified, ranked and stored together.
+        A `run_id` from create_run() is used for the run instead of a new one.
+        """
+        topics = self._unique_topics(topics)
+        if config.PIPELINE_MODE == "streaming":
+            budget = config.PIPELINE_RUN_BUDGET_SECONDS
+            with deadline.deadline_scope(deadline.Deadline(budget) if budget else None):
+                return asyncio.run(self.start_pipeline_streaming(topics))
+
+        print(f"[CommanderAgent] Pipeline started for topics: {topics}")
+        return self._execute(PipelineRun(topics, run_id or self.create_run(topics)))
+
+    @staticmethod
+    def _unique_topics(topics: List[str]) -> List[str]:
+        return list(dict.fromkeys(topic for topic in topics if topic))
+
+    def create_run(self, topics: List[str]) -> Optional[str]:
+        """
+        Registers a batch run owned by this process and returns its id, so a caller can record it
+        before the run starts. None if runs are not checkpointed (streaming mode, or checkpoints off).
+        """
+        if config.PIPELINE_MODE == "streaming" or not self.checkpoints:
+            return None
+        return self.checkpoints.create_run(self._unique_topics(topics), self.owner)
+
+    def heartbeat_runs(self):
+        """Renews this process's ownership of its unfinished runs; called every RUN_HEARTBEAT_SECONDS."""
+        if self.checkpoints:
+            self.checkpoints.heartbeat(self.owner)
+
+    def run_status(self, run_id: str) -> Optional[str]:
+        return self.checkpoints.run_status(run_id) if self.checkpoints else None
+
+    def resume_run(self, run_id: str) -> Optional[Dict]:
+        """
+        Takes over one interrupted run, whatever process owned it, and finishes it from its
+        checkpoint. For callers that know the owner has stopped, such as a queue worker taking over
+        a job whose lease expired. Returns None if the run is over or unknown.
+        """
+        if not self.checkpoints or not self.checkpoints.claim_run(run_id, self.owner):
+            return None
+        return self._resume(run_id)
+
+    def resume_incomplete_runs(self) -> List[Dict]:
+        """
+        Resumes batch runs that were interrupted by a crash or a shutdown, oldest first. Each run
+        is claimed before it is resumed, and only runs no live process owns can be claimed, so
+        several processes never resume the same run. Called at startup and then every
+        RUN_RESUME_CHECK_SECONDS, since a crashed owner's runs only become claimable once its
+        heartbeat has lapsed; a call made while another is still resuming returns at once.
+        """
+        if not self.checkpoints or not self._resume_lock.acquire(blocking=False):
+            return []
+        results = []
+        try:
+            while (run_id := self.checkpoints.claim_resumable_run(self.owner)) is not None:
+                try:
+                    result = self._resume(run_id)
+                except Exception as e:
+                    print(f"[CommanderAgent] Resumed run {run_id} failed: {e}")
+                    self.checkpoints.set_status(run_id, "failed")
+                    continue
+                results.append(result)
+                if isinstance(result, dict) and result.get("status") == "interrupted":
+                    # This process is shutting down; the remaining runs are left for the next one.
+                    break
+        finally:
+            self._resume_lock.release()
+        return results
+
+    def _resume(self, run_id: str) -> Dict:
+        run = PipelineRun.restore(self.checkpoints.load_run(run_id))
+        print(f"[CommanderAgent] Resuming run {run_id} for topics {run.topics} "
+              f"(completed stages: {run.completed or 'none'}).")
+        return self._execute(run)
+
+    def checkpoint_active_runs(self) -> int:
+        """
+        Asks every running batch run to stop after its current batches and saves its state,
+        so the next start resumes it. Returns the number of runs checkpointed.
+        """
+        with self._runs_lock:
+            runs = list(self._active_runs.values())
+        for run in runs:
+            run.stop_requested.set()
+            self._save_checkpoint(run, status="checkpointed")
+        if runs:
+            print(f"[CommanderAgent] Checkpointed {len(runs)} in-flight runs.")
+        return len(runs)
+
+    def _save_checkpoint(self, run: PipelineRun, status: Optional[str] = None, articles: Optional[List[NewsArticle]] = None):
+        if not self.checkpoints or not run.run_id:
+            return
+        articles = run.articles if articles is None else articles
+        if articles:
+            self.checkpoints.save_articles(run.run_id, articles, run.positions())
+        self.checkpoints.save_state(run.run_id, run.to_state(), status)
+
+    def _on_stage_done(self, run: PipelineRun, stage: str):
+        run.completed.append(stage)
+        # Articles are snapshotted once they exist and then updated batch by batch.
+        self._save_checkpoint(run, articles=run.articles if stage == "prepare" else [])
+
+    def _on_batch_done(self, run: PipelineRun, stage: str, batch: Optional[list]):
+        # Batches abandoned at a timeout or deadline may still finish after their run has ended.
+        if not self.checkpoints or not batch or run.run_id not in self._active_runs:
+            return
+        articles = [m for g in batch for m in g.members] if stage == "classify" else batch
+        if all(isinstance(article, NewsArticle) for article in articles):
+            self.checkpoints.save_articles(run.run_id, articles, run.positions())
+
+    def _execute(self, run: PipelineRun):
+        if run.run_id:
+            with self._runs_lock:
+                self._active_runs[run.run_id] = run
+        status = "failed"
+        try:
+            missing = [receiver for receiver in self.dag.receivers() if receiver not in self.a2a_bus.agents]
+            if missing:
+                raise ValueError(f"PIPELINE_DAG refers to unregistered agents: {missing}")
+            # The deadline reaches every crawler, LLM and HTTP call made for this run.
+            with deadline.deadline_scope(run.deadline):
+                report = self.dag.run(
+                    run,
+                    completed=run.completed,
+                    on_stage_done=lambda stage: self._on_stage_done(run, stage),
+                    on_batch_done=lambda stage, batch: self._on_batch_done(run, stage, batch),
+                    should_stop=run.stop_requested.is_set,
+                )
+            if any(entry["status"] == "interrupted" for entry in report.values()):
+                status = "checkpointed"
+                print(f"[CommanderAgent] Run {run.run_id} interrupted; it will resume on the next start.")
+                return {"status": "interrupted", "run_id": run.run_id}
+            status = "completed"
+            expired = [stage for stage, entry in report.items() if entry["status"] == "expired"]
+            if expired:
+                pending = sum(1 for article in run.articles if article.pending)
+                print(f"[CommanderAgent] Run hit its {run.deadline.seconds:.0f}s time budget in {expired}; "
+                      f"stored what was done, {pending} articles pending.")
+            if report["prepare"]["status"] == "stopped":
+                print("[CommanderAgent] Pipeline stopped: No articles found.")
+                return {"status": "failed", "reason": "No articles found"}
+        finally:
+            self._finish(run)
+            if run.run_id:
+                with self._runs_lock:
+                    self._active_runs.pop(run.run_id, None)
+                if status == "checkpointed":
+                    self._save_checkpoint(run, status=status)
+                    # Stopped cleanly: any process may resume it without waiting for the heartbeat to lapse.
+                    self.checkpoints.release(run.run_id)
+                else:
+                    self.checkpoints.set_status(run.run_id, status)
+
+        self._print_classifier_report()
+        print(f"[CommanderAgent] Pipeline finished successfully. {len(run.articles)} articles processed and stored.")
+        return run.result
+
+    @staticmethod
+    async def _batches(queue: asyncio.Queue, limit: int) -> AsyncIterator[List[NewsArticle]]:
+        """
+        Yields lists of articles from a queue of lists until it receives None, merging
+        whatever is already waiting (up to `limit` articles) into one batch.
+        """
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch, done = list(item), False
+            while len(batch) < limit and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    done = True
+                    break
+                batch.extend(item)
+            yield batch
+            if done:
+                return
+
+    async def _lookup_images(self, articles: List[NewsArticle]):
+        urls = [article.url for article in articles if not article.image]
+        if not urls:
+            return
+        try:
+            images = await get_og_image_extractor().lookup_many_async(urls)
+        except Exception as e:
+            print(f"[CommanderAgent] Image lookup failed: {e}")
+            return
+        for article in articles:
+            article.image = article.image or images.get(article.url)
+
+    async def start_pipeline_streaming(self, topics: List[str]):
+        """
+        Runs the pipeline as concurrent stages connected by bounded queues:
+        classify (+ images) → stories and ranking → storage. Each article group moves on as soon
+        as it is done, and storage upserts every batch, so the first articles are visible after
+        roughly one crawl plus one classification instead of after the whole run.
+        """
+        print(f"[CommanderAgent] Streaming pipeline started for topics: {topics}")
+        started = time.monotonic()
+
+        crawled = await asyncio.gather(
+            *(self.a2a_bus.send_async("commander_agent", "crawler_agent", topic) for topic in topics)
+        )
+        raw_articles = [
+            {**raw_article, "topic": topic} for topic, results in zip(topics, crawled) for raw_article in results or []
+        ]
+        articles = self._add_pending(self._build_articles(raw_articles))
+        if not articles:
             print("[CommanderAgent] Pipeline stopped: No articles found.")
             return {"status": "failed", "reason": "No articles found"}
+        print(f"[CommanderAgent] Crawl finished after {time.monotonic() - started:.2f}s.")
+
+        new_articles = self._apply_known(articles)
+        new_ids = {article.id for article in new_articles}
+        known_articles = [article for article in articles if article.id not in new_ids]
+        groups = self.near_duplicates.group(new_articles)
+        for group in groups:
+            self._link_duplicates(group)
+
+        classify_queue: asyncio.Queue = asyncio.Queue(maxsize=config.STREAM_QUEUE_SIZE)
+        rank_queue: asyncio.Queue = asyncio.Queue(maxsize=config.STREAM_QUEUE_SIZE)
+        store_queue: asyncio.Queue = asyncio.Queue(maxsize=config.STREAM_QUEUE_SIZE)
+        workers = config.STREAM_CLASSIFY_WORKERS
+        progress = {"stored": 0, "first_stored_after": None}
+
+        async def produce():
+            for group in groups:
+                await classify_queue.put(group)
+            for _ in range(workers):
+                await classify_queue.put(None)
+
+        async def classify_worker():
+            while (group := await classify_queue.get()) is not None:
+                article = group.representative
+                # Like batch mode: groups carried over already classified are not classified again.
+                if group.archive_category or article.category != _UNCATEGORIZED:
+                    category = group.archive_category or article.category
+                    await self._lookup_images(group.members)
+                else:
+                    category, _ = await asyncio.gather(
+                        self.a2a_bus.send_async(
+                            "commander_agent", "classifier_agent",
+                            {"title": article.title, "summary": article.summary},
+                        ),
+                        self._lookup_images(group.members),
+                    )
+                self._apply_category(group, category)
+                await rank_queue.put(group.members)
+
+        async def feed_known():
+            # Known articles skip classification and ranking, but still get images and stories.
+            for start in range(0, len(known_articles), config.STREAM_BATCH_SIZE):
+                batch = known_articles[start:start + config.STREAM_BATCH_SIZE]
+                await self._lookup_images(batch)
+                await rank_queue.put(batch)
+
+        async def enrich():
+            await asyncio.gather(feed_known(), *(classify_worker() for _ in range(workers)))
+            await rank_queue.put(None)
+
+        async def rank():
+            async for batch in self._batches(rank_queue, config.STREAM_BATCH_SIZE):
+                await get_executor("cpu").run(self.stories.assign, batch)
+                to_rank = [article for article in batch if article.id in new_ids and article.ranked_at is None]
+                if to_rank:
+                    ranking: RankResponse = await self.a2a_bus.send_async(
+                        "commander_agent", "ranker_agent", RankRequest(articles=to_rank)
+                    )
+                    self._apply_ranking(to_rank, ranking)
+                await store_queue.put(batch)
+            await store_queue.put(None)
+
+        async def store():
+            async for batch in self._batches(store_queue, config.STREAM_BATCH_SIZE):
+                self._mark_pending([article for article in batch if article.id in new_ids])
+                await self.a2a_bus.send_async(
+                    "commander_agent", "storage_agent", StoreRequest(articles=batch, upsert=True)
+                )
+                await get_executor("cpu").run(self._remember_articles, batch, new_ids)
+                if progress["first_stored_after"] is None:
+                    progress["first_stored_after"] = round(time.monotonic() - started, 3)
+                    print(f"[CommanderAgent] First articles stored after {progress['first_stored_after']}s.")
+                progress["stored"] += len(batch)
 
-        # 2. Process each article (the crawler now also provides a summary)
-        processed_articles: List[NewsArticle] = []
-        for i, raw_article in enumerate(raw_articles):
-            print(f"--- Processing article {i+1}/{len(raw_articles)}: {raw_article['title']} ---")
-            
-            # The raw_article from the new crawler already contains the summary
-            article = NewsArticle(
-                title=raw_article['title'],
-                url=raw_article['url'],
-                source=raw_article.get('source'),
-                summary=raw_article.get('summary', 'No summary available.') # Get summary from crawler
-            )
-
-            # The summarizer agent is no longer needed.
-            # summary = self.a2a_bus.send(...)
-            # article.summary = summary
-
-            category = self.a2a_bus.send(
-                sender="commander_agent", 
-                receiver="classifier_agent", 
-                message={"title": article.title, "summary": article.summary}
-            )
-            article.category = category
-            
-            article.image = f"https://picsum.photos/seed/{article.id}/400/300"
-
-            processed_articles.append(article)
-            print(f"--- Finished processing article {i+1} ---")
-
-        # 3. Rank the collected articles
-        titles_to_rank = [article.title for article in processed_articles]
-        score_map = self.a2a_bus.send("commander_agent", "ranker_agent", titles_to_rank)
-
-        if score_map:
-            for i, article in enumerate(processed_articles):
-                # The ID from the ranker prompt is 1-based
-                article.popularity = score_map.get(str(i + 1), 0) # Ensure key is string if needed
-
-        # 4. Store the final list
-        result = self.a2a_bus.send("commander_agent", "storage_agent", processed_articles)
-
-        print(f"[CommanderAgent] Pipeline finished successfully. {len(processed_articles)} articles processed and stored.")
-        return result
+        tasks = [asyncio.create_task(stage()) for stage in (produce, enrich, rank, store)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed stage would leave the others blocked on their queues.
+            for task in tasks:
+                task.cancel()
+            raise
 
+        self._print_classifier_report()
+        elapsed = time.monotonic() - started
+        print(f"[CommanderAgent] Streaming pipeline finished in {elapsed:.2f}s. {progress['stored']} articles processed and stored.")
+        return {
+            "status": "saved",
+            "count": progress["stored"],
+            "mode": "streaming",
+            "first_stored_after": progress["first_stored_after"],
+            "elapsed": round(elapsed, 3),
+        }
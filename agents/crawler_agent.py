@@ -3,7 +3,7 @@ import json
 import re
 from typing import List, Dict
 from core.llm_client import LLMClient
-from core.tools import google_web_search
+from core.tools import google_web_search, google_multi_search, fetch_article_texts
 
 class CrawlerAgent:
     def __init__(self, a2a_bus, llm_client: LLMClient):
@@ -18,13 +18,16 @@ class CrawlerAgent:
 
         prompt = f"""You are a news analyst. Your task is to find {max_articles} recent, significant news articles about '{topic}'.
 
-You MUST use the provided search tool to find the news. Do not make up news.
+You MUST use the provided search tools to find the news. Do not make up news.
+For broad topics, prefer a single google_multi_search call with the topic plus a few synonyms or translations, instead of many separate searches.
+Once you have picked the articles, call fetch_article_texts ONCE with all of their URLs and write each summary from the returned text. If an article's text is empty, summarize from its search result instead.
 
 For each article, you must provide:
 1. The exact title of the article.
 2. The full URL.
 3. The source publication name.
-4. A 3-sentence summary in Traditional Chinese.
+4. The publication date exactly as given by the search tool's "published" field.
+5. A 3-sentence summary in Traditional Chinese.
 
 **ACCURACY IS PARAMOUNT.** The URL, title, and source *must* come from the search tool. The summary must be based on the real article content. I will be checking your work.
 
@@ -38,6 +41,7 @@ Example format for when articles are found:
       "title": "Verified News Title from Search",
       "url": "https://example.com/the-correct-url",
       "source": "Example News Outlet",
+      "published": "Mon, 13 Oct 2025 07:00:00 GMT",
       "summary": "A three-sentence summary based on the content at the provided URL."
     }}
   ]
@@ -45,8 +49,10 @@ Example format for when articles are found:
 """
 
         try:
-            response_text = self.llm.chat(prompt, tools=[google_web_search])
-            
+            response_text = self.llm.chat(prompt, tools=[google_web_search, google_multi_search, fetch_article_texts])
+            if response_text is None:
+                return []
+
             # Use regex to find the JSON block more reliably
             json_match = re.search(r'```json\s*\n(.*?)\n\s*```', response_text, re.DOTALL)
             if not json_match:
@@ -1,18 +1,28 @@
 # agents/ranker_agent.py
+from core import config
+from core.executors import get_executor
 from core.llm_client import LLMClient
-from typing import List, Dict
+from core.messages import RankRequest, RankResponse
+from core.news_article import NewsArticle
+from core.popularity import PopularityModel, get_popularity_model
+from typing import List, Dict, Optional, Tuple, Union
 import json
+import numpy as np
+
+RANKER_MODES = ("llm", "local", "blend")
 
 class RankerAgent:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, popularity_model: Optional[PopularityModel] = None,
+                 mode: str = config.RANKER_MODE):
+        if mode not in RANKER_MODES:
+            raise ValueError(f"Unknown ranker mode '{mode}', expected one of {RANKER_MODES}")
         self.llm = llm_client
+        self.mode = mode
+        # Scores articles from cheap signals (source, recency, story size, ...) without an LLM call.
+        self.popularity = popularity_model or get_popularity_model()
 
-    def rank(self, titles: List[str]) -> Dict[int, int]:
-        """Ranks a list of article titles and returns a mapping of index to score."""
-        print(f"[RankerAgent] Ranking {len(titles)} titles...")
-        if not titles:
-            return {}
-
+    def _rank_chunk(self, titles: List[str]) -> Dict[int, float]:
+        """Asks the LLM to score one prompt's worth of titles; keys are 1-based positions in `titles`."""
         titles_for_prompt = "\n".join([f"{i+1}. {title}" for i, title in enumerate(titles)])
 
         prompt = f"""Based on the following list of news titles, please evaluate the potential popularity of each on a scale from 0 to 100. Consider factors like public interest, impact, and keyword relevance. Your response MUST be a JSON array of objects, where each object has 'id' (the original number) and 'score' (0-100).
@@ -24,17 +34,115 @@ Example JSON response: [{{"id": 1, "score": 85}}, {{"id": 2, "score": 60}}]"""
 
         try:
             response_text = self.llm.chat(prompt)
+            if response_text is None:
+                return {}
             json_part = response_text[response_text.find('['):response_text.rfind(']')+1]
             scores = json.loads(json_part)
-            
-            score_map = {item['id']: item['score'] for item in scores}
-            print("[RankerAgent] Successfully ranked titles.")
-            return score_map
-        except (json.JSONDecodeError, KeyError) as e:
+            return {int(item['id']): float(item['score']) for item in scores}
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
             print(f"[RankerAgent] Error parsing LLM response for ranking: {e}. Returning empty scores.")
-            return {{}}
+            return {}
+
+    def _plan_chunks(self, ids: List[str]) -> Tuple[List[str], List[List[str]]]:
+        """
+        Splits article ids into chunks. A few anchor articles, spread evenly over the list,
+        are added to every chunk so each chunk's scores can be mapped onto a common scale.
+        """
+        num_anchors = min(config.RANK_ANCHOR_COUNT, len(ids))
+        anchors = [ids[i] for i in sorted({int(i) for i in np.linspace(0, len(ids) - 1, num_anchors)})]
+        anchor_set = set(anchors)
+        rest = [article_id for article_id in ids if article_id not in anchor_set]
+        size = max(1, config.RANK_CHUNK_SIZE - len(anchors))
+        return anchors, [anchors + rest[start:start + size] for start in range(0, len(rest), size)]
+
+    @staticmethod
+    def _calibrate(chunk_scores: List[Dict[str, float]], anchors: List[str]) -> Dict[str, float]:
+        """
+        Merges per-chunk scores (keyed by article id) onto one scale. The reference score of an
+        anchor is its median over all chunks; each chunk is mapped onto the references with a
+        least-squares line fitted on its anchors (just an offset if the anchors barely differ).
+        """
+        reference = {}
+        for anchor in anchors:
+            seen = [scores[anchor] for scores in chunk_scores if anchor in scores]
+            if seen:
+                reference[anchor] = float(np.median(seen))
+
+        merged: Dict[str, float] = dict(reference)
+        for scores in chunk_scores:
+            common = [anchor for anchor in reference if anchor in scores]
+            x = np.array([scores[anchor] for anchor in common], dtype=float)
+            y = np.array([reference[anchor] for anchor in common], dtype=float)
+            slope, offset = 1.0, 0.0
+            if len(common) >= 2 and x.std() >= 5:
+                slope, offset = np.polyfit(x, y, 1)
+                slope = max(slope, 0.1)  # a chunk never reverses the order of its own titles
+            elif common:
+                offset = float((y - x).mean())
+            for article_id, score in scores.items():
+                if article_id not in reference:
+                    merged[article_id] = float(np.clip(slope * score + offset, 0, 100))
+        return merged
+
+    def _score_chunk(self, articles: List[NewsArticle]) -> Dict[str, float]:
+        """LLM scores for one chunk, translated from prompt positions back to article ids."""
+        result = self._rank_chunk([article.title for article in articles])
+        return {articles[pos - 1].id: min(max(score, 0.0), 100.0) for pos, score in result.items() if 1 <= pos <= len(articles)}
+
+    def rank_with_llm(self, articles: List[NewsArticle]) -> Dict[str, float]:
+        """Scores articles with the LLM; articles it returned no score for are left out."""
+        print(f"[RankerAgent] Ranking {len(articles)} titles...")
+        if not articles:
+            return {}
+        if len(articles) <= config.RANK_CHUNK_SIZE:
+            scores = self._score_chunk(articles)
+            if scores:
+                print("[RankerAgent] Successfully ranked titles.")
+            return scores
+
+        # Long lists are scored in parallel chunks, so no single call has to return hundreds of scores.
+        by_id = {article.id: article for article in articles}
+        anchors, chunks = self._plan_chunks(list(by_id))
+        print(f"[RankerAgent] Scoring {len(chunks)} chunks with {len(anchors)} shared anchors...")
+        futures = get_executor("llm").fan_out(
+            lambda chunk: self._score_chunk([by_id[i] for i in chunk]), chunks, limit=config.RANK_MAX_WORKERS
+        )
+        chunk_scores = [future.result() for future in futures]
+
+        failed = sum(1 for scores in chunk_scores if not scores)
+        if failed:
+            print(f"[RankerAgent] {failed} of {len(chunks)} chunks returned no scores.")
+        merged = self._calibrate([scores for scores in chunk_scores if scores], anchors)
+        print(f"[RankerAgent] Successfully ranked {len(merged)} of {len(articles)} titles.")
+        return merged
+
+    def rank(self, request: RankRequest) -> RankResponse:
+        """
+        Ranks the requested articles according to the ranker mode. In "blend" mode the local score
+        is a prior: it is mixed with the LLM score where there is one and stands in for it where
+        the LLM returned none.
+        """
+        articles = request.articles
+        if self.mode == "llm":
+            scores = self.rank_with_llm(articles)
+        else:
+            local_scores = self.popularity.score(articles)
+            print(f"[RankerAgent] Local popularity model scored {len(articles)} articles.")
+            scores = {article.id: float(score) for article, score in zip(articles, local_scores)}
+            if self.mode == "blend":
+                weight = config.RANK_BLEND_LLM_WEIGHT
+                for article_id, llm_score in self.rank_with_llm(articles).items():
+                    scores[article_id] = weight * llm_score + (1 - weight) * scores[article_id]
+
+        return RankResponse(
+            scores={article_id: int(round(score)) for article_id, score in scores.items()},
+            missing=[article.id for article in articles if article.id not in scores],
+            mode=self.mode,
+        )
 
-    def receive(self, titles: List[str]) -> Dict[int, int]:
-        """Receives a list of titles to start the ranking process."""
+    def receive(self, request: Union[RankRequest, List[NewsArticle]]) -> RankResponse:
+        """Receives a RankRequest (or a plain list of articles) to start the ranking process."""
         print(f"[RankerAgent] Received ranking task...")
-        return self.rank(titles)
+        if not isinstance(request, RankRequest):
+            request = RankRequest(articles=request)
+        return self.rank(request)
@@ -1,17 +1,29 @@
 
 # agents/storage_agent.py
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 import json
 import asyncio
+import threading
+from contextlib import contextmanager
 import aiofiles
 from pathlib import Path
-from typing import List, Dict
+try:
+    import fcntl
+except ImportError:  # Windows: only one writer process is supported
+    fcntl = None
+from core import config
+from core.messages import StoreRequest
 from core.news_article import NewsArticle
+from core.popularity import decayed_popularity
 
 class StorageAgent:
     def __init__(self, storage_path: str = "data/news_storage.json"):
         self.storage_path = Path(storage_path)
-        self._lock = asyncio.Lock()
+        # Writers may run on different threads and event loops (pipeline stages write as they
+        # finish), and in several worker processes, so writes are serialized with a thread lock
+        # and a lock file; readers rely on the atomic swap.
+        self._lock = threading.Lock()
+        self._lock_path = self.storage_path.with_suffix(".lock")
         
         # Create directory if it doesn't exist
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
@@ -21,40 +33,130 @@ class StorageAgent:
             with open(self.storage_path, 'w', encoding='utf-8') as f:
                 json.dump([], f)
 
-    async def receive(self, articles: List[NewsArticle]):
+    async def receive(self, message: Union[List[NewsArticle], StoreRequest]):
         """
         Asynchronously receives a list of processed NewsArticle objects and saves them.
-        This will overwrite the existing file with the new list.
+        This will overwrite the existing file with the new list, unless the message is a
+        StoreRequest with upsert=True, in which case the articles are merged in by id.
         """
-        print(f"[StorageAgent] Received {len(articles)} articles to store.")
-        await self._write(articles)
+        request = message if isinstance(message, StoreRequest) else StoreRequest(articles=message)
+        print(f"[StorageAgent] Received {len(request.articles)} articles to store.")
+        if request.upsert:
+            count = await self.upsert(request.articles, request.fields)
+            print(f"[StorageAgent] Successfully merged articles ({count} stored).")
+            return {"status": "saved", "count": len(request.articles), "stored": count}
+        await self._write(request.articles)
         print(f"[StorageAgent] Successfully saved articles.")
-        return {"status": "saved", "count": len(articles)}
+        return {"status": "saved", "count": len(request.articles)}
+
+    async def upsert(self, articles: List[NewsArticle], fields: Optional[List[str]] = None) -> int:
+        """
+        Merges articles into storage by id, replacing stored copies (or, if `fields` is given, only
+        those fields of them), and keeps at most STORAGE_MAX_ARTICLES of the newest.
+        Returns the number of stored articles.
+        """
+        dumped = [article.model_dump() for article in articles]
+        return await asyncio.to_thread(self._upsert_sync, dumped, fields)
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _upsert_sync(self, articles: List[Dict], fields: Optional[List[str]]) -> int:
+        with self._write_lock():
+            merged = {article["id"]: article for article in self._read_sync() if "id" in article}
+            for article in articles:
+                stored = merged.get(article["id"])
+                if stored is None:
+                    merged[article["id"]] = article
+                    continue
+                if fields is None:
+                    # Topic tags accumulate across runs of different topics.
+                    article["topics"] = list(dict.fromkeys(stored.get("topics", []) + article["topics"]))
+                    merged[article["id"]] = article
+                else:
+                    stored.update({field: article[field] for field in fields})
+            stored = sorted(merged.values(), key=lambda x: x.get("timestamp", 0), reverse=True)
+            stored = stored[:config.STORAGE_MAX_ARTICLES]
+            self._dump_sync(stored)
+        return len(stored)
 
     async def load_all(self) -> List[Dict]:
         """Asynchronously loads all articles from the JSON file."""
-        async with self._lock:
-            try:
-                async with aiofiles.open(self.storage_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    return json.loads(content)
-            except (FileNotFoundError, json.JSONDecodeError):
-                return []
-
-    async def get_sorted(self, sort_by: str = "latest") -> List[Dict]:
-        """Asynchronously loads and sorts articles from storage."""
+        return await self._read()
+
+    async def _read(self) -> List[Dict]:
+        try:
+            async with aiofiles.open(self.storage_path, 'r', encoding='utf-8') as f:
+                content = await f.read()
+                return json.loads(content)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _read_sync(self) -> List[Dict]:
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    async def get_sorted(self, sort_by: str = "latest", topic: Optional[str] = None) -> List[Dict]:
+        """Asynchronously loads and sorts articles from storage, optionally only those tagged with `topic`."""
         articles = await self.load_all()
+        if topic:
+            articles = [article for article in articles if topic in article.get("topics", [])]
         
         # The sorting logic itself is CPU-bound and fast, so no need for async here.
         if sort_by == "popular":
-            return sorted(articles, key=lambda x: x.get("popularity", 0), reverse=True)
+            # Stored scores are never recomputed; they decay with time since ranking instead.
+            scores = decayed_popularity(articles)
+            for article, score in zip(articles, scores):
+                article["effective_popularity"] = int(round(score))
+            return [articles[i] for i in (-scores).argsort(kind="stable")]
         else:  # 'latest'
             return sorted(articles, key=lambda x: x.get("timestamp", 0), reverse=True)
 
+    async def get_stories(self, sort_by: str = "latest", topic: Optional[str] = None) -> List[Dict]:
+        """
+        Returns one article per story (event): the first one in the requested order,
+        with 'story_count' set to how many stored articles belong to that story.
+        """
+        articles = await self.get_sorted(sort_by=sort_by, topic=topic)
+        counts: Dict[str, int] = {}
+        for article in articles:
+            key = article.get("story_id") or article.get("id")
+            counts[key] = counts.get(key, 0) + 1
+
+        cards = []
+        for article in articles:
+            key = article.get("story_id") or article.get("id")
+            if key in counts and counts[key] > 0:
+                cards.append({**article, "story_count": counts[key]})
+                counts[key] = 0
+        return cards
+
     async def _write(self, articles: List[NewsArticle]):
         """Asynchronously writes the list of articles to the JSON file."""
         articles_as_dicts = [article.model_dump() for article in articles]
-        async with self._lock:
-            async with aiofiles.open(self.storage_path, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(articles_as_dicts, ensure_ascii=False, indent=2))
+        await asyncio.to_thread(self._write_sync, articles_as_dicts)
+
+    def _write_sync(self, articles: List[Dict]):
+        with self._write_lock():
+            self._dump_sync(articles)
+
+    def _dump_sync(self, articles: List[Dict]):
+        # Write to a temporary file and swap it in, so readers never see a half-written list.
+        tmp_path = self.storage_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(articles, ensure_ascii=False, indent=2))
+        tmp_path.replace(self.storage_path)
 
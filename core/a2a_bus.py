@@ -1,5 +1,6 @@
 # core/a2a_bus.py
 import asyncio
+from core.executors import get_executor
 
 class A2ABus:
     def __init__(self):
@@ -8,7 +9,7 @@ class A2ABus:
     def register(self, name, agent):
         self.agents[name] = agent
 
-    def send(self, sender, receiver, message):
+    def _receive_method(self, receiver):
         if receiver not in self.agents:
             raise ValueError(f"Receiver agent '{receiver}' not found")
         
@@ -17,7 +18,10 @@ class A2ABus:
 
         if not receive_method:
             raise AttributeError(f"Agent '{receiver}' does not have a 'receive' method.")
+        return receive_method
 
+    def send(self, sender, receiver, message):
+        receive_method = self._receive_method(receiver)
         print(f"[A2A] {sender} → {receiver}: {str(message)[:50]}...")
         
         # Check if the receive method is an async coroutine
@@ -28,3 +32,15 @@ class A2ABus:
             return asyncio.run(receive_method(message))
         else:
             return receive_method(message)
+
+    async def send_async(self, sender, receiver, message):
+        """
+        Like send(), for callers already running in an event loop: async receivers are awaited
+        on the caller's loop, and sync receivers run on the llm executor (the sync agents are the
+        ones that call Gemini) so they do not block it.
+        """
+        receive_method = self._receive_method(receiver)
+        print(f"[A2A] {sender} → {receiver} (async): {str(message)[:50]}...")
+        if asyncio.iscoroutinefunction(receive_method):
+            return await receive_method(message)
+        return await get_executor("llm").run(receive_method, message)
@@ -0,0 +1,195 @@
+# core/article_fetcher.py
+import codecs
+import re
+from concurrent.futures import wait
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+import requests
+
+from core import config, deadline
+from core.cache import TTLCache
+from core.executors import get_executor
+from core.http_client import get_http_client
+
+# Elements whose text is never part of the article body.
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer", "aside", "form", "button", "select"}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Containers with these words in their class or id are page chrome, not content.
+_NEGATIVE_RE = re.compile(r"comment|footer|sidebar|share|social|related|recommend|advert|\bad-|promo|menu|breadcrumb|popup|subscribe|copyright", re.I)
+_BLOCK_TAGS = {"p", "h2", "h3", "li", "blockquote", "pre"}
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+_SPACE_RE = re.compile(r"\s+")
+_MIN_PARAGRAPH_CHARS = 20
+
+
+class _BodyExtractor(HTMLParser):
+    """
+    A small readability-style extractor. It collects text blocks, credits each block's
+    length (minus link text) to its parent and, at half weight, its grandparent, and
+    returns the blocks of the best-scoring container.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._stack: List[tuple] = []   # (tag, node_id, skipped)
+        self._next_node = 0
+        self._block: Optional[dict] = None
+        self._link_depth = 0
+        self.blocks: List[dict] = []
+
+    def _skipping(self) -> bool:
+        return bool(self._stack) and self._stack[-1][2]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        marker = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+        skipped = self._skipping() or tag in _SKIP_TAGS or bool(_NEGATIVE_RE.search(marker))
+        self._next_node += 1
+        self._stack.append((tag, self._next_node, skipped))
+        if skipped:
+            return
+        if tag == "a":
+            self._link_depth += 1
+        elif tag in _BLOCK_TAGS and self._block is None:
+            parents = [node for _, node, _ in self._stack[:-1]]
+            self._block = {
+                "parent": parents[-1] if parents else 0,
+                "grandparent": parents[-2] if len(parents) > 1 else 0,
+                "tag": tag, "text": [], "link_chars": 0,
+            }
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, _, skipped = self._stack.pop()
+            if not skipped and open_tag == "a":
+                self._link_depth = max(0, self._link_depth - 1)
+            if self._block is not None and open_tag == self._block["tag"]:
+                self._finish_block()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._block is None or self._skipping():
+            return
+        self._block["text"].append(data)
+        if self._link_depth:
+            self._block["link_chars"] += len(data.strip())
+
+    def _finish_block(self):
+        block, self._block = self._block, None
+        text = _SPACE_RE.sub(" ", "".join(block["text"])).strip()
+        if len(text) >= _MIN_PARAGRAPH_CHARS and block["link_chars"] < len(text) / 2:
+            self.blocks.append({"parent": block["parent"], "grandparent": block["grandparent"], "text": text,
+                                "score": len(text) - block["link_chars"]})
+
+    def main_text(self) -> str:
+        if self._block is not None:
+            self._finish_block()
+        if not self.blocks:
+            return ""
+        scores: Dict[int, float] = {}
+        for block in self.blocks:
+            scores[block["parent"]] = scores.get(block["parent"], 0) + block["score"]
+            scores[block["grandparent"]] = scores.get(block["grandparent"], 0) + block["score"] / 2
+        best = max(scores, key=scores.get)
+        chosen = [b["text"] for b in self.blocks if best in (b["parent"], b["grandparent"])]
+        return "\n".join(chosen)
+
+
+def extract_main_text(html: str) -> str:
+    """Returns the main article text of an HTML page, without navigation and other boilerplate."""
+    extractor = _BodyExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.main_text()
+
+
+class ArticleFetcher:
+    """
+    Downloads publisher pages concurrently through the shared HTTP client and extracts
+    their main text. Reads are streamed and capped in size, and results are cached by URL.
+    """
+    def __init__(self, max_bytes: int = config.ARTICLE_MAX_BYTES, max_workers: int = config.ARTICLE_FETCH_WORKERS):
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.cache = TTLCache(max_size=config.ARTICLE_CACHE_SIZE)
+
+    def _download_and_extract(self, url: str) -> str:
+        with get_http_client().stream("GET", url) as response:
+            if response.status_code != 200:
+                print(f"[ArticleFetcher] Warning: Received status code {response.status_code} for {url}")
+                return ""
+            if "html" not in response.headers.get("Content-Type", "html").lower():
+                return ""
+
+            extractor = _BodyExtractor()
+            decoder, read = None, 0
+            for chunk in response.iter_content(chunk_size=16384):
+                if decoder is None:
+                    # Prefer an explicit header charset, then a <meta charset>, then UTF-8.
+                    # (requests reports ISO-8859-1 for any text/* response without one.)
+                    charset_match = _META_CHARSET_RE.search(chunk[:4096])
+                    encoding = "utf-8"
+                    if "charset=" in response.headers.get("Content-Type", "").lower():
+                        encoding = response.encoding
+                    elif charset_match:
+                        encoding = charset_match.group(1).decode("ascii")
+                    try:
+                        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                    except LookupError:
+                        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                extractor.feed(decoder.decode(chunk))
+                read += len(chunk)
+                if read >= self.max_bytes:
+                    break
+            extractor.close()
+            return extractor.main_text()
+
+    def fetch(self, url: str) -> str:
+        """Returns the main text of one article, or an empty string if it could not be fetched."""
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+        try:
+            text = self._download_and_extract(url)
+        except (requests.RequestException, deadline.DeadlineExceeded) as e:
+            print(f"[ArticleFetcher] Warning: Could not fetch {url}. Error: {e}")
+            return ""
+        except Exception as e:
+            print(f"[ArticleFetcher] Warning: Could not extract text from {url}. Error: {e}")
+            text = ""
+        self.cache.set(url, text)
+        return text
+
+    def fetch_many(self, urls: List[str], timeout: Optional[float] = None) -> Dict[str, str]:
+        """Fetches several articles concurrently. Pages not done before the timeout are left out."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        timeout = config.ARTICLE_FETCH_DEADLINE_SECONDS if timeout is None else timeout
+        print(f"[ArticleFetcher] Fetching {len(urls)} articles...")
+
+        # Fetches share the http executor; one batch uses at most max_workers of its threads.
+        timeout = deadline.time_left(timeout)
+        futures = dict(zip(get_executor("http").fan_out(self.fetch, urls, limit=self.max_workers, timeout=timeout), urls))
+        done, not_done = wait(futures, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            print(f"[ArticleFetcher] Warning: {len(not_done)} articles missed the deadline.")
+        return {futures[future]: future.result() for future in done}
+
+
+_fetcher: Optional[ArticleFetcher] = None
+
+
+def get_article_fetcher() -> ArticleFetcher:
+    """Returns the shared ArticleFetcher, so its cache lives as long as the process."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = ArticleFetcher()
+    return _fetcher
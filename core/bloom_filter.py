@@ -0,0 +1,169 @@
+# core/bloom_filter.py
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-writer use only
+    fcntl = None
+
+# magic, version, capacity, count, num_bits, num_hashes, error_rate, padded to 64 bytes
+_HEADER = struct.Struct("<4sIQQQId")
+_HEADER_SIZE = 64
+_MAGIC = b"BLMF"
+_COUNT_OFFSET = 16
+_GROWTH = 2          # each new slice holds twice as many keys as the previous one
+_TIGHTENING = 0.5    # ...at half the false-positive rate, so the total stays below the target
+
+
+def _hash_pair(key: str) -> Tuple[int, int]:
+    """Two independent 64-bit hashes; every slice derives its k positions from them (double hashing)."""
+    return struct.unpack("<QQ", hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest())
+
+
+class _Slice:
+    """One fixed-size Bloom filter backed by a memory-mapped file shared between processes."""
+    def __init__(self, path: str, capacity: int = 0, error_rate: float = 0.0):
+        if not os.path.exists(path):
+            num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+            num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, 1, capacity, 0, num_bits, num_hashes, error_rate).ljust(_HEADER_SIZE, b"\0"))
+                f.truncate(_HEADER_SIZE + (num_bits + 7) // 8)
+            try:
+                # link() fails if another process created the slice first; theirs wins.
+                os.link(tmp_path, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp_path)
+        self.path = path
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, _, self.capacity, _, self.num_bits, self.num_hashes, self.error_rate = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a Bloom filter file")
+
+    @property
+    def count(self) -> int:
+        return struct.unpack_from("<Q", self._map, _COUNT_OFFSET)[0]
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def contains(self, hashes: Tuple[int, int]) -> bool:
+        data, (h1, h2), num_bits = self._map, hashes, self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % num_bits
+            if not data[_HEADER_SIZE + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, hashes: Tuple[int, int]):
+        data, (h1, h2), num_bits = self._map, hashes, self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % num_bits
+            data[_HEADER_SIZE + (position >> 3)] |= 1 << (position & 7)
+        struct.pack_into("<Q", data, _COUNT_OFFSET, self.count + 1)
+
+    @contextmanager
+    def locked(self):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ScalableBloomFilter:
+    """
+    A persisted, scalable Bloom filter for "definitely new" checks.
+
+    Keys live in a chain of memory-mapped slice files (<path>.0, <path>.1, ...). When the last
+    slice is full, a new one with twice the capacity and half the false-positive rate is added,
+    so the overall false-positive rate stays below error_rate however many keys are stored.
+    API and pipeline processes can open the same files: writes go straight to the shared
+    mapping and newly added slices are picked up on the next lookup.
+    """
+    def __init__(self, path: str, initial_capacity: int, error_rate: float):
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self._slices: List[_Slice] = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._open_new_slices()
+
+    def _slice_path(self, index: int) -> str:
+        return f"{self.path}.{index}"
+
+    def _open_new_slices(self):
+        """Maps slice files created since the last call, possibly by another process."""
+        while os.path.exists(self._slice_path(len(self._slices))):
+            self._slices.append(_Slice(self._slice_path(len(self._slices))))
+
+    def _refresh(self):
+        if not self._slices or self._slices[-1].full:
+            self._open_new_slices()
+
+    def _writable_slice(self) -> _Slice:
+        self._refresh()
+        if not self._slices or self._slices[-1].full:
+            index = len(self._slices)
+            # The first slice gets error_rate * (1 - r); slice i gets r**i of that, summing to error_rate.
+            self._slices.append(_Slice(
+                self._slice_path(index),
+                capacity=self.initial_capacity * _GROWTH ** index,
+                error_rate=self.error_rate * (1 - _TIGHTENING) * _TIGHTENING ** index,
+            ))
+        return self._slices[-1]
+
+    def __contains__(self, key: str) -> bool:
+        hashes = _hash_pair(key)
+        with self._lock:
+            self._refresh()
+            return any(bloom_slice.contains(hashes) for bloom_slice in self._slices)
+
+    def add(self, key: str) -> bool:
+        """Adds a key. Returns False if it (probably) was already present."""
+        hashes = _hash_pair(key)
+        with self._lock:
+            self._refresh()
+            if any(bloom_slice.contains(hashes) for bloom_slice in self._slices):
+                return False
+            bloom_slice = self._writable_slice()
+            with bloom_slice.locked():
+                bloom_slice.add(hashes)
+            return True
+
+    def update(self, keys: Iterable[str]) -> int:
+        """Adds several keys and returns how many were new."""
+        return sum(self.add(key) for key in keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return sum(bloom_slice.count for bloom_slice in self._slices)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "keys": sum(s.count for s in self._slices),
+                "slices": [{"capacity": s.capacity, "count": s.count, "error_rate": s.error_rate,
+                            "bytes": _HEADER_SIZE + (s.num_bits + 7) // 8} for s in self._slices],
+            }
@@ -0,0 +1,232 @@
+# core/checkpoints.py
+import json
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from core import config, state_db
+from core.news_article import NewsArticle
+from core.url_utils import canonicalize_url
+
+# Runs in these states were interrupted and can be resumed.
+RESUMABLE = ("running", "checkpointed")
+
+
+class CheckpointStore:
+    """
+    Persists batch pipeline runs in the state database: one row per run with its stage
+    progress (JSON), and one row per article with its latest enriched fields. Articles are
+    written after every finished batch, so a crashed run loses at most the batches in flight.
+
+    Each run has an owner, the process executing it, which renews the run's heartbeat every
+    RUN_HEARTBEAT_SECONDS. An interrupted run is resumed only by a process that claims it, and
+    only once its owner has released it or stopped renewing the heartbeat.
+    """
+    def __init__(self, db_path: str = config.STATE_DB_PATH):
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+
+    def create_run(self, topics: List[str], owner: str) -> str:
+        run_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO pipeline_runs (run_id, topics, status, state, created, updated, owner, heartbeat)
+                VALUES (?, ?, 'running', '{}', ?, ?, ?, ?)
+                """,
+                (run_id, json.dumps(topics, ensure_ascii=False), now, now, owner, now),
+            )
+        return run_id
+
+    def heartbeat(self, owner: str):
+        """Renews the heartbeat of every unfinished run `owner` holds."""
+        placeholders = ",".join("?" * len(RESUMABLE))
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE pipeline_runs SET heartbeat = ? WHERE owner = ? AND status IN ({placeholders})",
+                (time.time(), owner, *RESUMABLE),
+            )
+
+    def release(self, run_id: str):
+        """Gives up ownership of a checkpointed run, so any process may resume it right away."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE pipeline_runs SET owner = NULL WHERE run_id = ?", (run_id,))
+
+    def save_state(self, run_id: str, state: Dict, status: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pipeline_runs SET state = ?, status = COALESCE(?, status), updated = ? WHERE run_id = ?",
+                (json.dumps(state, ensure_ascii=False), status, time.time(), run_id),
+            )
+
+    def save_articles(self, run_id: str, articles: List[NewsArticle], positions: Dict[str, int]):
+        rows = [(run_id, a.id, positions.get(a.id, 0), a.model_dump_json()) for a in articles]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO pipeline_run_articles (run_id, article_id, position, data) VALUES (?, ?, ?, ?)
+                ON CONFLICT(run_id, article_id) DO UPDATE SET data = excluded.data
+                """,
+                rows,
+            )
+            self._conn.execute("UPDATE pipeline_runs SET updated = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def set_status(self, run_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE pipeline_runs SET status = ?, updated = ? WHERE run_id = ?",
+                               (status, time.time(), run_id))
+            if status not in RESUMABLE:
+                # Finished runs keep their summary row; their article snapshots are no longer needed.
+                self._conn.execute("DELETE FROM pipeline_run_articles WHERE run_id = ?", (run_id,))
+
+    def load_run(self, run_id: str) -> Optional[Dict]:
+        """Returns {"run_id", "topics", "status", "state", "articles"} for a stored run."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pipeline_runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            articles = [
+                NewsArticle.model_validate_json(r["data"]) for r in self._conn.execute(
+                    "SELECT data FROM pipeline_run_articles WHERE run_id = ? ORDER BY position", (run_id,)
+                )
+            ]
+        return {
+            "run_id": run_id,
+            "topics": json.loads(row["topics"] or "[]"),
+            "status": row["status"],
+            "state": json.loads(row["state"] or "{}"),
+            "articles": articles,
+        }
+
+    def run_status(self, run_id: str) -> Optional[str]:
+        """The stored status of a run, or None if there is no such run."""
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM pipeline_runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row["status"] if row is not None else None
+
+    def _claim(self, owner: str, condition: str, params: tuple) -> Optional[str]:
+        """Makes `owner` the owner of the oldest unfinished run matching `condition`, in one write transaction."""
+        now = time.time()
+        placeholders = ",".join("?" * len(RESUMABLE))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"""
+                    SELECT run_id FROM pipeline_runs WHERE status IN ({placeholders}) AND {condition}
+                    ORDER BY created LIMIT 1
+                    """,
+                    (*RESUMABLE, *params),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE pipeline_runs SET status = 'running', owner = ?, heartbeat = ?, updated = ? WHERE run_id = ?",
+                        (owner, now, now, row["run_id"]),
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return row["run_id"] if row is not None else None
+
+    def claim_run(self, run_id: str, owner: str) -> bool:
+        """
+        Takes over one unfinished run whatever its current owner, for callers that know that
+        owner has stopped (a job queue worker whose lease expired). False if the run is over.
+        """
+        return self._claim(owner, "run_id = ?", (run_id,)) is not None
+
+    def claim_resumable_run(self, owner: str) -> Optional[str]:
+        """
+        Claims the oldest interrupted run that no live process owns and returns its id, or None.
+        Runs whose owner's heartbeat is older than RUN_OWNER_TIMEOUT_SECONDS count as unowned;
+        runs of unfinished queue jobs are left to the job's next worker. Runs older than
+        CHECKPOINT_MAX_AGE_HOURS are abandoned.
+        """
+        now = time.time()
+        cutoff = now - config.CHECKPOINT_MAX_AGE_HOURS * 3600
+        placeholders = ",".join("?" * len(RESUMABLE))
+        with self._lock, self._conn:
+            stale = [row["run_id"] for row in self._conn.execute(
+                f"SELECT run_id FROM pipeline_runs WHERE status IN ({placeholders}) AND created < ?",
+                (*RESUMABLE, cutoff),
+            )]
+            self._conn.executemany("UPDATE pipeline_runs SET status = 'abandoned', updated = ? WHERE run_id = ?",
+                                   [(now, run_id) for run_id in stale])
+            self._conn.executemany("DELETE FROM pipeline_run_articles WHERE run_id = ?", [(run_id,) for run_id in stale])
+        if stale:
+            print(f"[CheckpointStore] Abandoned {len(stale)} interrupted runs older than {config.CHECKPOINT_MAX_AGE_HOURS}h.")
+        return self._claim(
+            owner,
+            """
+            (owner IS NULL OR heartbeat IS NULL OR heartbeat < ?)
+            AND run_id NOT IN (
+                SELECT run_id FROM pipeline_jobs WHERE run_id IS NOT NULL AND status IN ('queued', 'running')
+            )
+            """,
+            (now - config.RUN_OWNER_TIMEOUT_SECONDS,),
+        )
+
+
+class PendingArticles:
+    """
+    Articles a run stored before it could classify or rank them (its time budget ran out).
+    The next run takes them back and finishes them; ones older than PENDING_MAX_AGE_HOURS are dropped.
+    """
+    def __init__(self, db_path: str = config.STATE_DB_PATH):
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+
+    def add(self, articles: List[NewsArticle]):
+        # Ages count from when the article was first built, so a re-queued one is not retried forever.
+        rows = [(canonicalize_url(a.url), a.model_dump_json(), a.timestamp) for a in articles]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO pending_articles (canonical_url, data, added) VALUES (?, ?, ?)
+                ON CONFLICT(canonical_url) DO UPDATE SET data = excluded.data
+                """,
+                rows,
+            )
+
+    def take(self) -> List[NewsArticle]:
+        """Removes and returns every pending article that is not too old to retry."""
+        cutoff = time.time() - config.PENDING_MAX_AGE_HOURS * 3600
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT data, added FROM pending_articles ORDER BY added").fetchall()
+            self._conn.execute("DELETE FROM pending_articles")
+        expired = sum(1 for row in rows if row["added"] < cutoff)
+        if expired:
+            print(f"[PendingArticles] Dropped {expired} pending articles older than {config.PENDING_MAX_AGE_HOURS}h.")
+        return [NewsArticle.model_validate_json(row["data"]) for row in rows if row["added"] >= cutoff]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_articles").fetchone()[0]
+
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Returns the shared CheckpointStore."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore()
+        return _store
+
+
+_pending: Optional[PendingArticles] = None
+
+
+def get_pending_articles() -> PendingArticles:
+    """Returns the shared PendingArticles queue."""
+    global _pending
+    with _store_lock:
+        if _pending is None:
+            _pending = PendingArticles()
+        return _pending
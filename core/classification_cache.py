@@ -0,0 +1,110 @@
+# core/classification_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from core import config, state_db
+from core.near_dup import article_texts
+
+
+def content_hash(title: str, summary: Optional[str]) -> str:
+    """A hash of the normalized title and summary, so re-crawled copies of an article map to the same key."""
+    texts = article_texts(title, summary)
+    return hashlib.blake2b(f"{texts['t']}\n{texts.get('s', '')}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def categories_key(categories: List[str]) -> str:
+    return hashlib.blake2b("\n".join(categories).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ClassificationCache:
+    """
+    A persistent LRU cache from article content to category.
+
+    Entries are written through to SQLite and the most recently used max_size of them are
+    loaded on start. Every entry records the category list it was classified against;
+    entries from a different list are dropped, so changing NEWS_CATEGORIES invalidates the cache.
+    """
+    def __init__(self, categories: List[str], db_path: str = config.STATE_DB_PATH,
+                 max_size: int = config.CLASSIFICATION_CACHE_SIZE):
+        self.categories_key = categories_key(categories)
+        self.max_size = max_size
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        with self._conn:
+            stale = self._conn.execute(
+                "DELETE FROM classification_cache WHERE categories_key != ?", (self.categories_key,)
+            ).rowcount
+        if stale:
+            print(f"[ClassificationCache] Category list changed; dropped {stale} cached classifications.")
+        rows = self._conn.execute(
+            "SELECT content_hash, category FROM classification_cache ORDER BY last_used DESC LIMIT ?", (max_size,)
+        ).fetchall()
+        for row in reversed(rows):
+            self._data[row["content_hash"]] = row["category"]
+
+    def get_many(self, articles: List[Tuple[str, Optional[str]]]) -> List[Optional[str]]:
+        """Returns the cached category of each (title, summary), or None where there is none."""
+        keys = [content_hash(title, summary) for title, summary in articles]
+        now = time.time()
+        with self._lock:
+            categories = []
+            for key in keys:
+                category = self._data.get(key)
+                if category is not None:
+                    self._data.move_to_end(key)
+                categories.append(category)
+            hit_keys = [key for key, category in zip(keys, categories) if category is not None]
+            self.hits += len(hit_keys)
+            self.misses += len(keys) - len(hit_keys)
+            if hit_keys:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE classification_cache SET last_used = ? WHERE content_hash = ?",
+                        [(now, key) for key in hit_keys],
+                    )
+        return categories
+
+    def get(self, title: str, summary: Optional[str]) -> Optional[str]:
+        return self.get_many([(title, summary)])[0]
+
+    def set_many(self, entries: List[Tuple[str, Optional[str], str]]):
+        """Caches (title, summary, category) entries, evicting the least recently used beyond max_size."""
+        rows: Dict[str, str] = {content_hash(title, summary): category for title, summary, category in entries}
+        now = time.time()
+        with self._lock:
+            for key, category in rows.items():
+                self._data[key] = category
+                self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.max_size:
+                evicted.append(self._data.popitem(last=False)[0])
+            with self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT INTO classification_cache (content_hash, category, categories_key, last_used)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(content_hash) DO UPDATE SET
+                        category = excluded.category,
+                        categories_key = excluded.categories_key,
+                        last_used = excluded.last_used
+                    """,
+                    [(key, category, self.categories_key, now) for key, category in rows.items()],
+                )
+                self._conn.executemany(
+                    "DELETE FROM classification_cache WHERE content_hash = ?", [(key,) for key in evicted]
+                )
+
+    def set(self, title: str, summary: Optional[str], category: str):
+        self.set_many([(title, summary, category)])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
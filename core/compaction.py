@@ -0,0 +1,94 @@
+# core/compaction.py
+import html
+import re
+from typing import List, Dict, Optional
+from core import config
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+# CJK ideographs, kana and hangul are roughly one token per character.
+_WIDE_CHAR_RE = re.compile(r"[぀-ヿ㐀-鿿가-힯豈-﫿]")
+
+# The only fields the model needs to pick and cite articles.
+_KEPT_FIELDS = ("title", "link", "source", "published")
+
+
+def strip_html(text: str) -> str:
+    """Removes tags and entities and collapses whitespace."""
+    if not text:
+        return ""
+    text = html.unescape(_TAG_RE.sub(" ", text))
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """A cheap token estimate: one token per CJK character, one per ~4 other characters."""
+    if not text:
+        return 0
+    wide = len(_WIDE_CHAR_RE.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cuts text so its estimated size fits the budget, marking the cut with an ellipsis."""
+    if estimate_tokens(text) <= budget:
+        return text
+    used, end = 0.0, 0
+    for end, char in enumerate(text):
+        used += 1 if _WIDE_CHAR_RE.match(char) else 0.25
+        if used > budget - 1:
+            break
+    return text[:end].rstrip() + "…"
+
+
+def _is_redundant(summary: str, title: str, source: Optional[str]) -> bool:
+    """Google News summaries are usually just the title and the source again."""
+    rest = summary.replace(title, "")
+    if source:
+        rest = rest.replace(source, "")
+    return len(rest.strip(" -|–—")) < 10
+
+
+def compact_search_results(
+    results: List[Dict],
+    entry_tokens: Optional[int] = None,
+    total_tokens: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Shrinks search results before they are sent back to the model as a function response.
+    Every entry keeps its title, link, source and date; the budgets apply to summaries only.
+    Summaries are cleaned, de-duplicated against the title, capped per entry, and dropped for
+    the lowest-ranked entries once the total summary budget is spent.
+    """
+    entry_tokens = entry_tokens or config.TOOL_RESULT_ENTRY_TOKENS
+    total_tokens = total_tokens or config.TOOL_RESULT_TOTAL_TOKENS
+
+    compacted, summaries = [], []
+    for result in results:
+        entry = {field: strip_html(str(result[field])) for field in _KEPT_FIELDS if result.get(field)}
+        # "Mon, 13 Oct 2025 07:00:00 GMT" -> "Mon, 13 Oct 2025 07:00:00" (feeds always use GMT)
+        if "published" in entry:
+            entry["published"] = entry["published"][:25]
+        summary = strip_html(result.get("summary", ""))
+        if summary and not _is_redundant(summary, entry.get("title", ""), entry.get("source")):
+            summaries.append(summary)
+        else:
+            summaries.append("")
+        compacted.append(entry)
+
+    used = 0
+    for entry, summary in zip(compacted, summaries):
+        if not summary:
+            continue
+        summary = truncate_to_tokens(summary, entry_tokens)
+        cost = estimate_tokens(summary)
+        if used + cost > total_tokens:
+            continue
+        entry["summary"] = summary
+        used += cost
+
+    before = sum(estimate_tokens(str(value)) for result in results for value in result.values())
+    after = sum(estimate_tokens(value) for entry in compacted for value in entry.values())
+    print(f"[compaction] Search results: {len(results)} entries, ~{before} → ~{after} tokens "
+          f"(~{used} in summaries).")
+    return compacted
@@ -8,6 +8,16 @@ LLM_MODEL = "gemini-2.5-flash"  # 預設模型，可改成 gemini-1.5-pro / flas
 
 # === Database ===
 DB_PATH = os.path.join("database", "news.db")
+# 管線狀態 (已見文章索引等) 的 SQLite 檔，資料表定義於 database/schema.sql
+STATE_DB_PATH = os.path.join("data", "pipeline_state.db")
+# 已見網址的 Bloom filter (memory-mapped，API 與 pipeline 行程共用)
+SEEN_BLOOM_PATH = os.path.join("data", "seen_urls.bloom")
+SEEN_BLOOM_CAPACITY = 100_000    # 第一個分片的容量，滿了會自動擴充
+SEEN_BLOOM_ERROR_RATE = 0.001    # 整體誤判率上限
+
+# 新聞 JSON 儲存檔 (StorageAgent)
+STORAGE_PATH = os.path.join("data", "news_storage.json")
+STORAGE_MAX_ARTICLES = 1000    # 逐批寫入 (upsert) 時最多保留的文章數，超過時捨棄最舊的
 
 # === Logging ===
 LOG_LEVEL = "INFO"
@@ -17,17 +27,173 @@ LOG_LEVEL = "INFO"
 SCHEDULER_TIMEZONE = "Asia/Taipei"
 SCHEDULER_HOUR = 9
 SCHEDULER_MINUTE = 0
+# 排程與 /api/run-topics 預設處理的主題；所有主題在同一次執行中一起爬取、去重與分類
+SCHEDULER_TOPICS = ["人工智慧", "科技", "財經"]
+
+# === Pipeline 執行模式 ===
+# "batch"：依 PIPELINE_DAG 執行；"streaming"：各階段以有界佇列串接，文章處理完即寫入
+PIPELINE_MODE = os.environ.get("PIPELINE_MODE", "batch")
+# batch 模式的階段 DAG。每個階段在 depends_on 全部完成後立即開始，互不相依的階段並行執行。
+#   handler     : CommanderAgent 內的階段實作 (預設同 name)
+#   receiver    : 階段透過 A2A bus 傳送工作的 agent
+#   executor    : 批次執行所用的具名執行緒池 (見 EXECUTORS)；未指定時由該階段自建
+#   concurrency : 同時處理的批次數；batch_size：每批文章數 (None 為一次全部)
+#   timeout     : 秒數，逾時即放棄該階段；optional：失敗時不影響後續階段
+#   budgeted    : 受整次執行時限 (PIPELINE_RUN_BUDGET_SECONDS) 約束；False 的本地階段在時限後仍會執行，
+#                 以便把已完成的部分結果寫入
+PIPELINE_DAG = [
+    {"name": "crawl", "receiver": "crawler_agent", "executor": "llm", "concurrency": 8, "batch_size": 1},  # 每個主題一批
+    {"name": "prepare", "depends_on": ["crawl"], "budgeted": False},  # 建立文章、比對已見索引、近似重複分組
+    {"name": "classify", "receiver": "classifier_agent", "depends_on": ["prepare"], "executor": "llm",
+     "concurrency": 3, "batch_size": 10, "timeout": 300},
+    {"name": "images", "depends_on": ["prepare"], "executor": "http", "concurrency": 2, "batch_size": 15,
+     "timeout": 60, "optional": True},
+    {"name": "stories", "depends_on": ["prepare"], "budgeted": False},
+    {"name": "rank", "receiver": "ranker_agent", "depends_on": ["stories"], "executor": "llm", "timeout": 300},
+    {"name": "store", "receiver": "storage_agent", "depends_on": ["classify", "images", "rank"], "budgeted": False},
+    {"name": "remember", "depends_on": ["store"], "budgeted": False},  # 更新已見索引與近似重複簽章
+]
+# 每次執行的時限 (秒)，傳遞到爬蟲、LLM 與 HTTP 呼叫；時限到時寫入已完成的部分，
+# 未完成分類或排名的文章標記為 pending，由下一次執行接手。None 表示不限時
+PIPELINE_RUN_BUDGET_SECONDS = 1800
+PENDING_MAX_AGE_HOURS = 48      # pending 文章超過此時間仍未完成就不再重試
+# batch 模式的檢查點：每個階段與批次完成後寫入 STATE_DB，重啟時從中斷處繼續
+CHECKPOINT_ENABLED = True
+CHECKPOINT_MAX_AGE_HOURS = 24   # 超過此時間的未完成執行不再續跑
+RUN_HEARTBEAT_SECONDS = 30      # 執行中的行程更新其 pipeline 執行 heartbeat 的間隔
+RUN_OWNER_TIMEOUT_SECONDS = 120  # heartbeat 超過此時間未更新，其他行程才可接手續跑該執行
+RUN_RESUME_CHECK_SECONDS = 60   # 定期檢查是否有 owner 已中止的執行可接手續跑 (不只在啟動時)
+STREAM_QUEUE_SIZE = 16          # 階段之間佇列的容量 (背壓)
+STREAM_CLASSIFY_WORKERS = 4     # 同時進行分類的 worker 數
+STREAM_BATCH_SIZE = 16          # 排名與儲存階段一次最多合併處理的文章數
+
+# === Pipeline 工作行程 ===
+# "inline"：API 行程自行排程並執行 pipeline；"queue"：API 只讀取新聞並把執行請求寫入 STATE_DB 的工作佇列，
+# 由獨立的 worker 行程 (python -m scheduler.daily_scheduler) 排程與執行，兩者可分別擴充
+PIPELINE_EXECUTION = os.environ.get("PIPELINE_EXECUTION", "inline")
+JOB_POLL_SECONDS = 2            # worker 佇列為空時的輪詢間隔
+JOB_HEARTBEAT_SECONDS = 30      # worker 更新執行中工作 heartbeat (續租) 的間隔
+# 工作的 heartbeat 超過此時間未更新即視為 worker 已中止，重新排入佇列
+JOB_LEASE_SECONDS = 120
+JOB_MAX_ATTEMPTS = 2            # 每個工作最多執行次數
+JOB_RETENTION_HOURS = 72        # 已結束的工作保留多久
+JOB_SHUTDOWN_GRACE_SECONDS = 30  # worker 關閉時等待執行中 pipeline 存檢查點並停止的時間
 
 # === MCP & Agent 名稱設定 ===
 AGENT_NAMES = {
     "crawler": "CrawlerAgent",
-    "summarizer": "SummarizerAgent",
     "classifier": "ClassifierAgent",
     "ranker": "RankerAgent",
     "commander": "CommanderAgent",
     "storage": "StorageAgent"
 }
 
+# === 新聞分類 ===
+NEWS_CATEGORIES = ["Politics", "Technology", "Sports", "Finance", "Entertainment", "World", "Health"]
+# 本地分類器 (字元 n-gram + naive Bayes)，信心度足夠時略過 LLM
+LOCAL_CLASSIFIER_PATH = os.path.join("data", "local_classifier.npz")
+LOCAL_CLASSIFIER_FEATURES = 2 ** 18     # n-gram 雜湊維度
+LOCAL_CLASSIFIER_THRESHOLD = 0.95       # 信心度達此值直接採用本地結果
+LOCAL_CLASSIFIER_MIN_SAMPLES = 100      # 訓練樣本不足時一律交給 LLM
+LOCAL_CLASSIFIER_EVIDENCE = 5           # 信心度校正：每篇文章視為多少個獨立的 n-gram 證據
+LOCAL_CLASSIFIER_AUDIT_RATE = 0.1       # 高信心結果中抽查 (仍送 LLM) 的比例
+LOCAL_CLASSIFIER_MIN_PRECISION = 0.9    # 抽查準確率低於此值時暫停本地結果
+LOCAL_CLASSIFIER_MIN_AUDITS = 20        # 至少抽查幾篇才判斷準確率
+LOCAL_CLASSIFIER_SAVE_EVERY = 10        # 每學習幾篇存檔一次
+# 分類結果快取 (以標題 + 摘要的正規化雜湊為鍵)，分類清單變更時自動失效
+CLASSIFICATION_CACHE_SIZE = 20_000
+
+# === 搜尋設定 ===
+# Google News RSS 的語系組合，第一個為 google_web_search 的預設語系
+SEARCH_LOCALES = [
+    {"hl": "zh-TW", "gl": "TW", "ceid": "TW:zh-Hant"},
+    {"hl": "en-US", "gl": "US", "ceid": "US:en"},
+]
+SEARCH_MAX_RESULTS = 30          # 合併後回傳的候選文章上限
+SEARCH_DEADLINE_SECONDS = 20     # 多查詢 × 多語系搜尋的整體時限
+SEARCH_MAX_WORKERS = 8           # 單次搜尋最多同時抓取的 feed 數 (佔用 http 執行緒池)
+SEARCH_SKIP_SEEN = False         # 搜尋結果中略過已處理過的文章
+
+# === 工具回傳壓縮 ===
+# 搜尋結果回傳給 Gemini 前的 token 預算 (估算值)
+TOOL_RESULT_ENTRY_TOKENS = 80    # 每篇摘要上限
+TOOL_RESULT_TOTAL_TOKENS = 3000  # 單次工具回傳中所有摘要的總上限 (標題與連結一律保留，不計入)
+
+# === HTTP 連線設定 ===
+# 所有對外抓取 (RSS、轉址解析、文章內容) 共用同一個連線池
+HTTP_POOL_CONNECTIONS = 32       # 保留連線池的主機數
+HTTP_POOL_MAXSIZE = 8            # 每個主機保留的 keep-alive 連線數
+HTTP_MAX_CONCURRENCY = 32        # 全域同時請求上限
+HTTP_PER_HOST_CONCURRENCY = 4    # 單一主機同時請求上限
+HTTP_TIMEOUT_SECONDS = 10
+HTTP_USER_AGENT = "Mozilla/5.0 (compatible; MultiAgentNewsBot/1.0)"
+
+# === 執行緒池 ===
+# 阻塞工作依種類使用各自的有界執行緒池 (core/executors.py)，不佔用 asyncio 預設執行緒池，
+# 因此大量 pipeline 同時執行時，StorageAgent 讀取與 API 請求仍有執行緒可用。
+#   workers：執行緒數；queue：排隊上限，超過即拒絕 (API 回傳 429)
+EXECUTORS = {
+    "pipeline": {"workers": 2, "queue": 8},                  # 整次 pipeline 執行 (批次或串流)
+    "llm": {"workers": 8, "queue": 256},                     # Gemini 呼叫與 A2A bus 上的同步 agent
+    "http": {"workers": HTTP_MAX_CONCURRENCY, "queue": 1024},  # feed、轉址、內文與 og:image 抓取
+    "cpu": {"workers": os.cpu_count() or 4, "queue": 256},   # 事件分群、索引更新等本地計算
+}
+
+# === 行程池 ===
+# 把 CPU 密集的批次計算交給常駐的工作行程 (core/process_pool.py)，不佔用 API 行程的 GIL，
+# pipeline 執行期間 API 延遲維持平穩。批次以 NumPy 陣列傳回。
+PROCESS_POOL_ENABLED = False
+PROCESS_POOL_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# 交給行程池的工作：near_dup (MinHash 簽章)、classify (本地分類器的 n-gram 特徵)
+PROCESS_POOL_TASKS = ["near_dup", "classify"]
+PROCESS_POOL_MIN_BATCH = 8       # 少於此數的批次直接在本行程計算，省去行程間傳輸
+# fork 可避免工作行程重新匯入 main.py；不支援 fork 的平台改用 spawn
+PROCESS_POOL_START_METHOD = "fork"
+
+# === 文章內容抓取 ===
+ARTICLE_MAX_BYTES = 1_500_000            # 每篇頁面最多讀取的位元組
+ARTICLE_FETCH_WORKERS = 8                # 單批最多同時抓取的頁面數 (佔用 http 執行緒池)
+ARTICLE_FETCH_DEADLINE_SECONDS = 30      # 一批文章的整體時限
+ARTICLE_CACHE_SIZE = 512                 # 依 URL 快取的文章數 (有效期 CACHE_EXPIRE_TIME)
+ARTICLE_EXCERPT_TOKENS = 400             # 每篇內文回傳給 Gemini 的 token 上限
+OG_IMAGE_MAX_BYTES = 262_144             # 找 og:image 時最多讀取的 <head> 位元組
+
+# === 近似重複偵測 (MinHash LSH) ===
+NEAR_DUP_NUM_PERM = 128          # MinHash 簽章長度
+NEAR_DUP_THRESHOLD = 0.5         # 估計 Jaccard 相似度達此值視為同一則新聞
+NEAR_DUP_SHINGLE_SIZE = 2        # 字元 shingle 長度 (適用中日韓文字)
+
+# === 新聞事件 (story) 分群 ===
+STORY_SIMILARITY_THRESHOLD = 0.35  # TF-IDF cosine 達此值即併入既有事件
+STORY_WINDOW_HOURS = 72            # 超過此時間未更新的事件不再接收新文章
+
+# === 熱門度排名 ===
+RANK_CHUNK_SIZE = 40               # 每次 LLM 呼叫最多評分幾則標題
+RANK_ANCHOR_COUNT = 5              # 每個 chunk 共用的錨點標題數，用來校正各 chunk 的分數尺度
+RANK_MAX_WORKERS = 4               # 單次排名最多同時進行的 LLM 呼叫數 (佔用 llm 執行緒池)
+# 排名引擎："llm" 只用 LLM、"local" 只用本地熱門度模型、"blend" 以本地分數為先驗與 LLM 分數加權
+RANKER_MODE = os.environ.get("RANKER_MODE", "llm")
+RANK_BLEND_LLM_WEIGHT = 0.7        # blend 模式中 LLM 分數的權重 (沒有 LLM 分數時只用本地分數)
+# 本地熱門度模型：各特徵的權重，score = 100 * sigmoid(bias + Σ weight * feature)
+RANK_LOCAL_WEIGHTS = {
+    "source": 1.0,       # log(來源權重)
+    "recency": 1.5,      # 依發布時間的指數衰減 (0~1)
+    "story": 0.8,        # log(1 + 同事件的其他文章數)
+    "duplicates": 0.6,   # log(1 + 近似重複文章數)
+    "velocity": 0.7,     # 標題關鍵字的近期出現速度
+}
+RANK_LOCAL_BIAS = -1.5
+RANK_RECENCY_HALF_LIFE_HOURS = 12
+RANK_TREND_WINDOW_HOURS = 24       # 關鍵字速度：最近一個視窗與前一個視窗的出現次數比
+# 已排名文章不再重新評分；查詢時以 popularity * 0.5 ** (經過時間 / 半衰期) 作為有效熱門度
+POPULARITY_HALF_LIFE_HOURS = 24
+# 新聞來源權重，未列出的來源為 1.0
+SOURCE_WEIGHTS = {
+    "Reuters": 1.5, "BBC": 1.4, "Bloomberg": 1.4, "The New York Times": 1.4, "CNN": 1.3,
+    "中央社": 1.4, "中央社 CNA": 1.4, "公視新聞網": 1.3, "聯合新聞網": 1.3, "自由時報": 1.3,
+    "中時新聞網": 1.2, "ETtoday新聞雲": 1.2, "TVBS新聞網": 1.2, "天下雜誌": 1.2, "經濟日報": 1.2,
+}
+
 # === 網頁設定 ===
 APP_HOST = "0.0.0.0"
 APP_PORT = 8000
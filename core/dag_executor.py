@@ -0,0 +1,238 @@
+# core/dag_executor.py
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from core import deadline
+from core.executors import get_executor
+
+
+class StageSpec(BaseModel):
+    """One stage of a pipeline DAG, as declared in config.PIPELINE_DAG."""
+    name: str
+    handler: Optional[str] = Field(default=None, description="Name of the stage implementation; defaults to `name`.")
+    receiver: Optional[str] = Field(default=None, description="A2A bus agent the stage sends its work to, if any.")
+    depends_on: List[str] = Field(default_factory=list)
+    executor: Optional[str] = Field(default=None, description="Named executor (core.executors) the batches run on.")
+    concurrency: int = Field(default=1, ge=1, description="Batches processed in parallel.")
+    batch_size: Optional[int] = Field(default=None, ge=1, description="Items per batch; None processes all at once.")
+    timeout: Optional[float] = Field(default=None, gt=0, description="Seconds before the stage is abandoned.")
+    optional: bool = Field(default=False, description="A failed optional stage does not stop its dependents.")
+    budgeted: bool = Field(default=True, description="Bound by the run's deadline; unbudgeted stages run even after it.")
+
+    @property
+    def handler_name(self) -> str:
+        return self.handler or self.name
+
+
+class StageHandler:
+    """
+    The implementation of a stage. `run(context, batch, receiver)` does the work; if `items` is
+    given, `items(context)` lists the work items and `run` is called once per batch of them,
+    otherwise `run` is called once with batch=None.
+    """
+    def __init__(self, run: Callable[[Any, Optional[list], Optional[str]], None],
+                 items: Optional[Callable[[Any], list]] = None):
+        self.run = run
+        self.items = items
+
+
+class StopPipeline(Exception):
+    """Raised by a stage to end the run early without an error (e.g. nothing was crawled)."""
+
+
+class _Interrupted(Exception):
+    """A stage stopped before all of its batches ran because the run is being stopped."""
+
+
+class DagExecutor:
+    """
+    Runs a pipeline declared as a DAG of stages. Every stage starts as soon as all the stages it
+    depends on have finished, so independent stages overlap and a run takes as long as its
+    critical path. Within a stage, batches run on up to `concurrency` threads.
+    """
+    def __init__(self, specs: List[StageSpec], handlers: Dict[str, StageHandler]):
+        self.specs = {spec.name: spec for spec in specs}
+        self.handlers = handlers
+        if len(self.specs) != len(specs):
+            raise ValueError("Pipeline DAG has duplicate stage names")
+        for spec in specs:
+            if spec.handler_name not in handlers:
+                raise ValueError(f"Stage '{spec.name}' has no handler named '{spec.handler_name}'")
+            for dependency in spec.depends_on:
+                if dependency not in self.specs:
+                    raise ValueError(f"Stage '{spec.name}' depends on unknown stage '{dependency}'")
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_config(cls, stages: List[dict], handlers: Dict[str, StageHandler]) -> "DagExecutor":
+        return cls([StageSpec(**stage) for stage in stages], handlers)
+
+    def _topological_order(self) -> List[str]:
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline DAG has a cycle through stage '{name}'")
+            visiting.add(name)
+            for dependency in self.specs[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.specs:
+            visit(name)
+        return order
+
+    def receivers(self) -> List[str]:
+        return sorted({spec.receiver for spec in self.specs.values() if spec.receiver})
+
+    def _run_stage(self, spec: StageSpec, context: Any,
+                   on_batch_done: Optional[Callable[[str, Optional[list]], None]] = None,
+                   should_stop: Optional[Callable[[], bool]] = None):
+        handler = self.handlers[spec.handler_name]
+
+        def work(batch: Optional[list]):
+            if should_stop is not None and should_stop():
+                raise _Interrupted()
+            if spec.budgeted:
+                deadline.check()
+                handler.run(context, batch, spec.receiver)
+            else:
+                with deadline.deadline_scope(None):
+                    handler.run(context, batch, spec.receiver)
+            if on_batch_done is not None:
+                on_batch_done(spec.name, batch)
+
+        if handler.items is None:
+            batches = [None]
+        else:
+            items = list(handler.items(context))
+            size = spec.batch_size or max(len(items), 1)
+            batches = [items[start:start + size] for start in range(0, len(items), size)]
+            if not batches:
+                return
+        # A budgeted stage is never waited on past the run's deadline.
+        bounded = spec.budgeted and deadline.current_deadline() is not None
+        if len(batches) == 1 and spec.timeout is None and not bounded:
+            work(batches[0])
+            return
+
+        pool = None
+        timeout = deadline.time_left(spec.timeout) if spec.budgeted else spec.timeout
+        if spec.executor:
+            futures = get_executor(spec.executor).fan_out(work, batches, limit=spec.concurrency, timeout=timeout)
+        else:
+            pool = ThreadPoolExecutor(max_workers=min(spec.concurrency, len(batches)),
+                                      thread_name_prefix=f"stage-{spec.name}")
+            futures = [deadline.submit(pool, work, batch) for batch in batches]
+        finished, pending = wait(futures, timeout=timeout)
+        # Threads cannot be interrupted; timed-out batches are abandoned and finish in the background.
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        interrupted = False
+        for future in finished:
+            try:
+                future.result()
+            except _Interrupted:
+                interrupted = True
+        if interrupted:
+            raise _Interrupted()
+        if pending and bounded and deadline.expired():
+            raise deadline.DeadlineExceeded(f"stage '{spec.name}' ran out of the run's time budget "
+                                            f"({len(pending)} of {len(batches)} batches unfinished)")
+        if pending:
+            raise TimeoutError(f"stage '{spec.name}' exceeded its {spec.timeout}s timeout "
+                               f"({len(pending)} of {len(batches)} batches unfinished)")
+
+    def run(self, context: Any, completed: Optional[List[str]] = None,
+            on_stage_done: Optional[Callable[[str], None]] = None,
+            on_batch_done: Optional[Callable[[str, Optional[list]], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, dict]:
+        """
+        Runs every stage and returns a report of {stage: {"status", "finished_after", "error"}}.
+        Stages whose required dependencies failed are skipped; the first required failure is
+        re-raised once no stage is running anymore. A StopPipeline ends the run early.
+
+        For resumable runs: stages listed in `completed` are not run again, `on_stage_done` and
+        `on_batch_done` are called as work finishes (to checkpoint it), and once `should_stop`
+        returns True no further stages are started and the rest are reported as "interrupted".
+
+        Under a deadline (core.deadline.deadline_scope), budgeted stages that run out of time are
+        reported as "expired": the batches they finished are kept and their dependents still run,
+        so unbudgeted stages can store the partial result.
+        """
+        started = time.monotonic()
+        report: Dict[str, dict] = {name: {"status": "done", "restored": True}
+                                   for name in completed or () if name in self.specs}
+        interrupted = False
+        running: Dict[Future, str] = {}
+        failure: Optional[BaseException] = None
+        stopped = False
+
+        def blocked(name: str) -> bool:
+            return any(
+                report.get(dependency, {}).get("status") in ("failed", "skipped")
+                and not self.specs[dependency].optional
+                for dependency in self.specs[name].depends_on
+            )
+
+        def ready(name: str) -> bool:
+            return all(report.get(d, {}).get("status") in ("done", "expired", "failed", "skipped")
+                       for d in self.specs[name].depends_on)
+
+        with ThreadPoolExecutor(max_workers=len(self.specs), thread_name_prefix="dag") as pool:
+            while True:
+                if should_stop is not None and not interrupted and should_stop():
+                    interrupted = True
+                if not stopped and not interrupted and failure is None:
+                    for name in self.order:
+                        if name in report or name in running.values() or not ready(name):
+                            continue
+                        if blocked(name):
+                            report[name] = {"status": "skipped"}
+                            continue
+                        future = deadline.submit(pool, self._run_stage, self.specs[name], context, on_batch_done, should_stop)
+                        running[future] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    entry = {"finished_after": round(time.monotonic() - started, 2)}
+                    error = future.exception()
+                    if error is None:
+                        entry["status"] = "done"
+                        if on_stage_done is not None:
+                            on_stage_done(name)
+                    elif isinstance(error, _Interrupted):
+                        entry["status"] = "interrupted"
+                        interrupted = True
+                    elif isinstance(error, deadline.DeadlineExceeded):
+                        entry.update(status="expired", reason=str(error))
+                        print(f"[DagExecutor] Stage '{name}' expired: {error}")
+                    elif isinstance(error, StopPipeline):
+                        entry.update(status="stopped", reason=str(error))
+                        stopped = True
+                    else:
+                        entry.update(status="failed", error=f"{type(error).__name__}: {error}")
+                        print(f"[DagExecutor] Stage '{name}' failed: {entry['error']}")
+                        if not self.specs[name].optional and failure is None:
+                            failure = error
+                    report[name] = entry
+
+        for name in self.order:
+            report.setdefault(name, {"status": "interrupted" if interrupted else "skipped"})
+        print(f"[DagExecutor] Finished after {time.monotonic() - started:.2f}s: "
+              + ", ".join(f"{name}={report[name]['status']}@{report[name].get('finished_after', '-')}"
+                          for name in self.order))
+        if failure is not None:
+            raise failure
+        return report
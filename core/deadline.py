@@ -0,0 +1,72 @@
+# core/deadline.py
+import contextvars
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started, or waited for, after the run's time budget ran out."""
+
+
+class Deadline:
+    """A point in time by which a pipeline run must be finished."""
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+# The deadline of the run the current code works for. Context variables follow asyncio tasks
+# and asyncio.to_thread; plain thread pools need submit() below to carry it over (the named
+# executors in core.executors do so themselves).
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Makes `deadline` the current one for the code inside the with-block."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def expired() -> bool:
+    deadline = _current.get()
+    return deadline is not None and deadline.expired
+
+
+def check():
+    """Raises DeadlineExceeded if the current deadline has passed."""
+    deadline = _current.get()
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded(f"the run's {deadline.seconds:.0f}s time budget is exhausted")
+
+
+def time_left(timeout: Optional[float] = None) -> Optional[float]:
+    """
+    Returns `timeout` shortened to the time left before the current deadline (the time left if
+    timeout is None). Without a current deadline the timeout is returned unchanged.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return timeout
+    return deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+
+
+def submit(pool: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """Like pool.submit, but the task runs with the caller's context, and so its deadline."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
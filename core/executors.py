@@ -0,0 +1,166 @@
+# core/executors.py
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core import config
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a task is submitted to an executor whose queue is full."""
+
+
+class NamedExecutor:
+    """
+    A bounded thread pool for one kind of blocking work (whole pipeline runs, LLM calls,
+    outbound HTTP, local CPU work). Each kind gets its own threads, so a burst of one cannot
+    starve the others or asyncio's default executor, which serves StorageAgent and request work.
+
+    At most `max_queue` tasks may wait for a thread; further submissions raise ExecutorSaturated.
+    Tasks run with the submitter's context variables, so the run's deadline follows them.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-executor")
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+            "queued": 0, "active": 0, "peak_queued": 0, "peak_active": 0,
+            "wait_seconds": 0.0, "run_seconds": 0.0,
+        }
+
+    def _run(self, submitted_at: float, fn: Callable, args, kwargs):
+        started = time.monotonic()
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["active"] += 1
+            self._stats["peak_active"] = max(self._stats["peak_active"], self._stats["active"])
+            self._stats["wait_seconds"] += started - submitted_at
+        self._local.inside = True
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._local.inside = False
+            with self._lock:
+                self._stats["active"] -= 1
+                self._stats["failed" if failed else "completed"] += 1
+                self._stats["run_seconds"] += time.monotonic() - started
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._stats["queued"] >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise ExecutorSaturated(f"the {self.name} executor has {self.max_queue} tasks waiting already")
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+            self._stats["peak_queued"] = max(self._stats["peak_queued"], self._stats["queued"])
+        context = contextvars.copy_context()
+        try:
+            return self._pool.submit(context.run, self._run, time.monotonic(), fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._stats["queued"] -= 1
+            raise
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Runs fn on this executor and awaits its result, like asyncio.to_thread."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def fan_out(self, fn: Callable, items: Iterable, limit: Optional[int] = None,
+                timeout: Optional[float] = None) -> List[Future]:
+        """
+        Runs fn(item) for every item on at most `limit` of this executor's threads and returns
+        one future per item, in order. Futures cancelled before their item starts are skipped,
+        so callers can give up on the rest after a timeout.
+
+        When called from one of this executor's own threads, the caller works through the items
+        too, so nested fan-outs always make progress even if every other thread is busy. That
+        happens before the futures are returned, so a caller that waits on them with a timeout
+        must pass the same `timeout` here: the caller then starts no new item once it has passed
+        (the item it is on still finishes), and the items it left are not done when it waits.
+        """
+        items = list(items)
+        futures = [Future() for _ in items]
+        work: "queue.SimpleQueue" = queue.SimpleQueue()
+        for future, item in zip(futures, items):
+            work.put((future, item))
+
+        def lane(stop_at: Optional[float] = None):
+            while stop_at is None or time.monotonic() < stop_at:
+                try:
+                    future, item = work.get_nowait()
+                except queue.Empty:
+                    return
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(item))
+                except BaseException as e:
+                    future.set_exception(e)
+
+        lanes = min(limit or len(items), len(items))
+        nested = getattr(self._local, "inside", False)
+        submitted = 0
+        for _ in range(lanes - 1 if nested else lanes):
+            try:
+                self.submit(lane)
+                submitted += 1
+            except ExecutorSaturated:
+                # Fewer lanes only means less parallelism, as long as one lane runs.
+                if submitted or nested:
+                    break
+                raise
+        if nested and lanes:
+            contextvars.copy_context().run(lane, None if timeout is None else time.monotonic() + timeout)
+        return futures
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["run_seconds"] = round(stats["run_seconds"], 3)
+        return {"workers": self.max_workers, "max_queue": self.max_queue, **stats}
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executors: Dict[str, NamedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> NamedExecutor:
+    """Returns the shared executor `name`, sized by config.EXECUTORS."""
+    with _executors_lock:
+        if name not in _executors:
+            if name not in config.EXECUTORS:
+                raise ValueError(f"Unknown executor '{name}'; configure it in config.EXECUTORS")
+            settings = config.EXECUTORS[name]
+            _executors[name] = NamedExecutor(name, settings["workers"], settings["queue"])
+        return _executors[name]
+
+
+def executor_stats() -> Dict[str, Dict]:
+    """Returns the queue and thread metrics of every executor in use."""
+    with _executors_lock:
+        executors = list(_executors.values())
+    return {executor.name: executor.stats() for executor in executors}
+
+
+def shutdown_executors():
+    """Stops all executors; queued tasks are cancelled, running ones finish in the background."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=False)
@@ -0,0 +1,172 @@
+# core/http_client.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core import config, deadline
+
+
+class _HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.wait_seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class HttpClient:
+    """
+    A process-wide HTTP client for all outbound crawling.
+    It keeps one keep-alive connection pool per host and limits how many requests run
+    at once, both globally and per host, so concurrent stages cannot flood a publisher.
+    """
+    def __init__(
+        self,
+        pool_connections: int = config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = config.HTTP_POOL_MAXSIZE,
+        max_concurrency: int = config.HTTP_MAX_CONCURRENCY,
+        per_host_concurrency: int = config.HTTP_PER_HOST_CONCURRENCY,
+        timeout: float = config.HTTP_TIMEOUT_SECONDS,
+    ):
+        self.timeout = timeout
+        self.per_host_concurrency = per_host_concurrency
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = config.HTTP_USER_AGENT
+        # pool_connections is the number of per-host pools kept, pool_maxsize the keep-alive
+        # connections kept in each; block=True makes excess requests wait for a free connection.
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._global_slots = threading.BoundedSemaphore(max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_stats: Dict[str, _HostStats] = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host: str):
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_concurrency)
+                self._host_stats[host] = _HostStats()
+            return self._host_slots[host], self._host_stats[host]
+
+    @staticmethod
+    @contextmanager
+    def _acquire(slots: threading.BoundedSemaphore):
+        """Waits for a slot, but not past the current run's deadline."""
+        timeout = deadline.time_left()
+        if not slots.acquire(timeout=timeout):
+            raise deadline.DeadlineExceeded("no free connection slot before the run's deadline")
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def _timeout(self, timeout):
+        """The request timeout, shortened so a request never outlives the current run's deadline."""
+        deadline.check()
+        if isinstance(timeout, tuple):
+            return tuple(deadline.time_left(t) for t in timeout)
+        return deadline.time_left(timeout)
+
+    @contextmanager
+    def _slot(self, url: str):
+        """Holds one global and one per-host concurrency slot for the duration of a request."""
+        host = urlsplit(url).netloc.lower()
+        host_slots, stats = self._host_state(host)
+        started = time.monotonic()
+        with self._acquire(self._global_slots), self._acquire(host_slots):
+            with self._lock:
+                stats.wait_seconds += time.monotonic() - started
+                stats.requests += 1
+                stats.in_flight += 1
+                stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+            try:
+                yield
+            except Exception:
+                with self._lock:
+                    stats.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    stats.in_flight -= 1
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Sends a request and reads the whole body before releasing the slot."""
+        kwargs["timeout"] = self._timeout(kwargs.get("timeout", self.timeout))
+        kwargs.pop("stream", None)
+        with self._slot(url):
+            return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs):
+        """
+        Opens a streaming response. The slot is held, and the connection checked out,
+        until the with-block exits, so callers can stop reading early.
+        """
+        kwargs["timeout"] = self._timeout(kwargs.get("timeout", self.timeout))
+        with self._slot(url):
+            response = self.session.request(method, url, stream=True, **kwargs)
+            try:
+                yield response
+            finally:
+                response.close()
+
+    def stats(self) -> Dict:
+        """Returns per-host request counters and connection pool usage for tuning."""
+        with self._lock:
+            hosts = {host: stats.as_dict() for host, stats in self._host_stats.items()}
+        pools = {}
+        pool_manager = self._adapter.poolmanager
+        for key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            pools[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests_sent": pool.num_requests,
+                # The queue is pre-filled with None placeholders; only real entries are idle connections.
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+            }
+        return {
+            "max_concurrency": self._max_concurrency,
+            "per_host_concurrency": self.per_host_concurrency,
+            "in_flight": sum(stats["in_flight"] for stats in hosts.values()),
+            "hosts": hosts,
+            "pools": pools,
+        }
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Returns the shared, process-wide HttpClient."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,163 @@
+# core/job_queue.py
+import json
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from core import config, state_db
+
+# Jobs in these states are over; they are kept for JOB_RETENTION_HOURS so callers can look them up.
+FINISHED = ("done", "failed", "interrupted")
+
+
+class JobQueue:
+    """
+    Pipeline jobs in the state database, so API processes can hand runs to separate worker
+    processes (scheduler/daily_scheduler.py). Each job is claimed by one worker inside a write
+    transaction, and the worker renews its lease (the job's heartbeat) while the job runs. A job
+    whose lease has not been renewed for JOB_LEASE_SECONDS is taken to belong to a worker that
+    died and goes back in the queue, until it has been tried JOB_MAX_ATTEMPTS times; the next
+    worker resumes the job's run from its checkpoint.
+    """
+    def __init__(self, db_path: str = config.STATE_DB_PATH):
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+
+    def enqueue(self, kind: str, payload: Dict, dedupe_key: Optional[str] = None) -> Optional[str]:
+        """Adds a job and returns its id, or None if a job with the same dedupe_key was queued already."""
+        job_id = str(uuid.uuid4())
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT OR IGNORE INTO pipeline_jobs (job_id, kind, payload, dedupe_key, status, attempts, created)
+                VALUES (?, ?, ?, ?, 'queued', 0, ?)
+                """,
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), dedupe_key, time.time()),
+            )
+        return job_id if cursor.rowcount else None
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """Marks the oldest queued job as running for `worker` and returns it, or None if the queue is empty."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """
+                    UPDATE pipeline_jobs
+                    SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                        finished = CASE WHEN attempts >= ? THEN ? ELSE NULL END,
+                        error = 'worker lease expired', worker = NULL
+                    WHERE status = 'running' AND COALESCE(heartbeat, started) < ?
+                    """,
+                    (config.JOB_MAX_ATTEMPTS, config.JOB_MAX_ATTEMPTS, now, now - config.JOB_LEASE_SECONDS),
+                )
+                placeholders = ",".join("?" * len(FINISHED))
+                self._conn.execute(
+                    f"DELETE FROM pipeline_jobs WHERE status IN ({placeholders}) AND finished < ?",
+                    (*FINISHED, now - config.JOB_RETENTION_HOURS * 3600),
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM pipeline_jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        """
+                        UPDATE pipeline_jobs
+                        SET status = 'running', worker = ?, started = ?, heartbeat = ?, attempts = attempts + 1
+                        WHERE job_id = ?
+                        """,
+                        (worker, now, now, row["job_id"]),
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        if row is None:
+            return None
+        return {"job_id": row["job_id"], "kind": row["kind"], "payload": json.loads(row["payload"] or "{}"),
+                "attempts": row["attempts"] + 1, "run_id": row["run_id"]}
+
+    def renew(self, worker: str):
+        """Renews the lease on every job `worker` is running."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pipeline_jobs SET heartbeat = ? WHERE worker = ? AND status = 'running'",
+                (time.time(), worker),
+            )
+
+    def set_run(self, job_id: str, worker: str, run_id: str):
+        """Records the pipeline run a job started, so a worker that takes the job over can resume it."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pipeline_jobs SET run_id = ? WHERE job_id = ? AND worker = ? AND status = 'running'",
+                (run_id, job_id, worker),
+            )
+
+    def _finish(self, job_id: str, worker: str, status: str, result: Optional[Dict] = None,
+                error: Optional[str] = None) -> bool:
+        """
+        Records the outcome of a job `worker` holds. False if the worker's lease had expired and
+        the job was requeued or taken over, in which case the job is left as it is.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                UPDATE pipeline_jobs SET status = ?, result = ?, error = ?, finished = ?
+                WHERE job_id = ? AND worker = ? AND status = 'running'
+                """,
+                (status, json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                 error, time.time(), job_id, worker),
+            )
+        if not cursor.rowcount:
+            print(f"[JobQueue] {worker} no longer holds job {job_id}; its '{status}' outcome was not recorded.")
+        return bool(cursor.rowcount)
+
+    def complete(self, job_id: str, worker: str, result: Optional[Dict]) -> bool:
+        return self._finish(job_id, worker, "done", result=result)
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        return self._finish(job_id, worker, "failed", error=error)
+
+    def interrupt(self, job_id: str, worker: str) -> bool:
+        """Marks a job whose worker stopped mid-run; the run itself resumes from its checkpoint."""
+        return self._finish(job_id, worker, "interrupted", error="worker stopped; the run resumes from its checkpoint")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pipeline_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM pipeline_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, kind, status, attempts, worker, run_id, error, created, started, finished "
+                "FROM pipeline_jobs ORDER BY created DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Returns the shared JobQueue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
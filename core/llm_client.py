@@ -1,5 +1,8 @@
 # core/llm_client.py
+from typing import Optional
+
 import google.generativeai as genai
+from core import deadline
 
 class LLMClient:
     def __init__(self, model, api_key):
@@ -7,9 +10,16 @@ class LLMClient:
         # Set up the model for automatic tool use
         self.model = genai.GenerativeModel(model)
 
-    def chat(self, prompt: str, tools: list = None) -> str:
+    @staticmethod
+    def _request_options() -> dict:
+        """Limits each API call to the time left before the current run's deadline, if any."""
+        deadline.check()
+        timeout = deadline.time_left()
+        return {} if timeout is None else {"timeout": timeout}
+
+    def chat(self, prompt: str, tools: list = None) -> Optional[str]:
         """
-        Sends a prompt to the Gemini API and returns the response.
+        Sends a prompt to the Gemini API and returns the response, or None if the call failed.
         If tools are provided, it handles the tool-calling loop.
         """
         try:
@@ -21,7 +31,7 @@ class LLMClient:
                 )
 
             chat = model_to_use.start_chat()
-            response = chat.send_message(prompt)
+            response = chat.send_message(prompt, request_options=self._request_options())
 
             while response.candidates[0].content.parts and response.candidates[0].content.parts[0].function_call:
                 function_call = response.candidates[0].content.parts[0].function_call
@@ -46,12 +56,12 @@ class LLMClient:
                         "name": function_call.name,
                         "response": tool_response,
                         }
-                    }]
+                    }],
+                    request_options=self._request_options(),
                 )
 
             return response.text
 
         except Exception as e:
             print(f"[LLMClient] An unexpected error occurred: {e}")
-            # Return a more structured error to the caller
-            return f"Error: [LLMClient] An unexpected error occurred: {e}"
+            return None
@@ -0,0 +1,179 @@
+# core/local_classifier.py
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core import config, process_pool, state_db
+from core.near_dup import article_texts
+
+
+def _ngram_indices(title: str, summary: Optional[str], n_features: int, ngram_range: Tuple[int, int]) -> np.ndarray:
+    """Hashes the character n-grams of an article's normalized title and summary into feature indices."""
+    indices = []
+    for text in article_texts(title, summary).values():
+        for n in range(ngram_range[0], ngram_range[1] + 1):
+            for i in range(len(text) - n + 1):
+                indices.append(zlib.crc32(text[i:i + n].encode("utf-8")) % n_features)
+    return np.asarray(indices, dtype=np.int64)
+
+
+def ngram_features(articles: List[Tuple[str, Optional[str]]], n_features: int,
+                   ngram_range: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The feature indices of several articles, concatenated, and each article's count of them.
+    Two flat int32 arrays instead of a list of arrays, so a batch crosses processes cheaply.
+    """
+    all_indices = [_ngram_indices(title, summary, n_features, ngram_range) for title, summary in articles]
+    lengths = np.array([len(indices) for indices in all_indices], dtype=np.int32)
+    flat = np.concatenate(all_indices) if all_indices else np.zeros(0, dtype=np.int64)
+    return flat.astype(np.int32), lengths
+
+
+class LocalClassifier:
+    """
+    A CPU-only multinomial naive Bayes classifier over hashed character n-grams.
+    It learns incrementally from labelled articles and scores whole batches with NumPy,
+    so confident predictions can skip the LLM round trip.
+    """
+    def __init__(self, categories: List[str], model_path: str = config.LOCAL_CLASSIFIER_PATH,
+                 n_features: int = config.LOCAL_CLASSIFIER_FEATURES, ngram_range: Tuple[int, int] = (1, 3)):
+        self.categories = list(categories)
+        self.model_path = model_path
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.feature_counts = np.zeros((len(self.categories), n_features), dtype=np.float32)
+        self.class_counts = np.zeros(len(self.categories), dtype=np.float64)
+        self._load()
+
+    @property
+    def num_samples(self) -> int:
+        return int(self.class_counts.sum())
+
+    def _load(self):
+        if not os.path.exists(self.model_path):
+            return
+        try:
+            with np.load(self.model_path) as data:
+                saved = json.loads(str(data["meta"]))
+                if saved["categories"] != self.categories or saved["n_features"] != self.n_features:
+                    print("[LocalClassifier] Saved model has different categories or features; starting fresh.")
+                    return
+                self.feature_counts = data["feature_counts"].astype(np.float32)
+                self.class_counts = data["class_counts"].astype(np.float64)
+            print(f"[LocalClassifier] Loaded model trained on {self.num_samples} articles.")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"[LocalClassifier] Could not load {self.model_path}: {e}")
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+            tmp_path = f"{self.model_path}.tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                feature_counts=self.feature_counts,
+                class_counts=self.class_counts,
+                meta=json.dumps({"categories": self.categories, "n_features": self.n_features}),
+            )
+            os.replace(tmp_path, self.model_path)
+            self._unsaved = 0
+
+    def _features(self, articles: List[Tuple[str, Optional[str]]]) -> Tuple[np.ndarray, np.ndarray]:
+        return process_pool.run("classify", ngram_features, articles, self.n_features, self.ngram_range,
+                                size=len(articles))
+
+    def learn(self, samples: List[Tuple[str, Optional[str], str]]):
+        """Updates the model with (title, summary, category) samples; unknown categories are ignored."""
+        samples = [sample for sample in samples if sample[2] in self.categories]
+        flat, lengths = self._features([(title, summary) for title, summary, _ in samples])
+        all_indices = np.split(flat, np.cumsum(lengths)[:-1]) if samples else []
+        with self._lock:
+            for (_, _, category), indices in zip(samples, all_indices):
+                label = self.categories.index(category)
+                self.feature_counts[label] += np.bincount(indices, minlength=self.n_features).astype(np.float32)
+                self.class_counts[label] += 1
+            self._unsaved += len(samples)
+            should_save = self._unsaved >= config.LOCAL_CLASSIFIER_SAVE_EVERY
+        if should_save:
+            self.save()
+
+    def predict(self, articles: List[Tuple[str, Optional[str]]]) -> List[Tuple[Optional[str], float]]:
+        """
+        Returns (category, confidence) for each (title, summary). The category is None while the
+        model has seen fewer than LOCAL_CLASSIFIER_MIN_SAMPLES articles.
+        """
+        if not articles:
+            return []
+        if self.num_samples < config.LOCAL_CLASSIFIER_MIN_SAMPLES:
+            return [(None, 0.0)] * len(articles)
+
+        flat, lengths = self._features(articles)
+        with self._lock:
+            # Laplace-smoothed log P(feature | class) and log P(class)
+            smoothed = self.feature_counts + 1.0
+            feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+            log_prior = np.log((self.class_counts + 1.0) / (self.class_counts.sum() + len(self.categories)))
+
+        # Gather every article's n-gram columns at once, then sum them per article: (classes, articles)
+        log_likelihood = np.zeros((len(self.categories), len(articles)))
+        nonempty = lengths > 0
+        if flat.size:
+            offsets = np.concatenate([[0], np.cumsum(lengths[nonempty])[:-1]])
+            log_likelihood[:, nonempty] = np.add.reduceat(feature_log_prob[:, flat], offsets, axis=1)
+        # Overlapping n-grams are far from independent, so the raw naive Bayes posterior is almost
+        # always ~1.0. Averaging per n-gram and scaling to a fixed amount of evidence keeps the
+        # confidence meaningful for the escalation threshold.
+        log_likelihood = log_likelihood / np.maximum(lengths, 1) * config.LOCAL_CLASSIFIER_EVIDENCE
+        scores = log_prior[:, None] + log_likelihood
+        scores -= scores.max(axis=0, keepdims=True)
+        posterior = np.exp(scores)
+        posterior /= posterior.sum(axis=0, keepdims=True)
+
+        best = posterior.argmax(axis=0)
+        return [
+            (self.categories[label], float(posterior[label, i])) if nonempty[i] else (None, 0.0)
+            for i, label in enumerate(best)
+        ]
+
+    def bootstrap(self, storage_path: str = config.STORAGE_PATH, db_path: str = config.STATE_DB_PATH):
+        """Trains a fresh model from the labels already in the seen index and the JSON storage."""
+        samples: Dict[str, Tuple[str, Optional[str], str]] = {}
+        try:
+            conn = state_db.connect(db_path)
+            for row in conn.execute("SELECT title, summary, category FROM seen_articles"):
+                if row["title"]:
+                    samples[row["title"]] = (row["title"], row["summary"], row["category"])
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"[LocalClassifier] Could not read the seen index: {e}")
+        try:
+            with open(storage_path, encoding="utf-8") as f:
+                for article in json.load(f):
+                    if article.get("title"):
+                        samples.setdefault(article["title"], (article["title"], article.get("summary"), article.get("category")))
+        except (OSError, ValueError) as e:
+            print(f"[LocalClassifier] Could not read {storage_path}: {e}")
+        self.learn(list(samples.values()))
+        self.save()
+        print(f"[LocalClassifier] Bootstrapped from {self.num_samples} labelled articles.")
+
+
+_classifier: Optional[LocalClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_local_classifier() -> LocalClassifier:
+    """Returns the shared LocalClassifier, training it from history on first use."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = LocalClassifier(config.NEWS_CATEGORIES)
+            if not _classifier.num_samples:
+                _classifier.bootstrap()
+        return _classifier
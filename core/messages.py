@@ -0,0 +1,35 @@
+# core/messages.py
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from core.news_article import NewsArticle
+
+class RankRequest(BaseModel):
+    """
+    A ranking task sent to RankerAgent over the A2A bus.
+    Articles are identified by their stable id, never by their position in the list.
+    """
+    articles: List[NewsArticle]
+
+class RankResponse(BaseModel):
+    """
+    Popularity scores keyed by article id. Ranking may be partial (e.g. one chunk's LLM call
+    failed): articles without a score are listed in `missing` and `complete` is False.
+    """
+    scores: Dict[str, int] = Field(default_factory=dict, description="Article id -> popularity (0-100).")
+    missing: List[str] = Field(default_factory=list, description="Ids of requested articles that got no score.")
+    mode: str = Field(default="llm", description="The ranker mode that produced the scores.")
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+class StoreRequest(BaseModel):
+    """
+    Articles sent to StorageAgent. By default they replace the stored list; with upsert=True
+    they are merged into it by id, so a pipeline can store articles as they are ready. An upsert
+    with `fields` only updates those fields of articles already stored (e.g. popularity once
+    ranking is done); articles not stored yet are added whole.
+    """
+    articles: List[NewsArticle]
+    upsert: bool = False
+    fields: Optional[List[str]] = None
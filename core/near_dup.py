@@ -0,0 +1,249 @@
+# core/near_dup.py
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core import config, process_pool, state_db
+from core.news_article import NewsArticle
+
+# Universal hashing modulo a Mersenne prime; a * h + b stays below 2**62, so uint64 never overflows.
+_PRIME = np.uint64((1 << 31) - 1)
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+# Shorter summaries are placeholders like "Not summarized." and are not compared.
+_MIN_SUMMARY_CHARS = 20
+
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalizes and lowercases text and removes whitespace and punctuation."""
+    return _NON_WORD_RE.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+
+def article_texts(title: str, summary: Optional[str]) -> Dict[str, str]:
+    """
+    The texts an article is compared on: its title without the ' - Source' suffix, and its summary.
+    They are matched separately, since outlets often rewrite one and copy the other verbatim.
+    """
+    texts = {"t": normalize_text(_SOURCE_SUFFIX_RE.sub("", title or ""))}
+    summary = normalize_text(summary)
+    if len(summary) >= _MIN_SUMMARY_CHARS:
+        texts["s"] = summary
+    return texts
+
+
+def shingles(text: str, k: int) -> List[str]:
+    """Character k-shingles, which work for CJK text without a word segmenter."""
+    if len(text) <= k:
+        return [text] if text else []
+    return list({text[i:i + k] for i in range(len(text) - k + 1)})
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Picks the LSH (bands, rows) split whose similarity threshold (1/b)^(1/r) is closest to the target."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashLSH:
+    """MinHash signatures over character shingles with a banded LSH index for sublinear lookups."""
+    def __init__(self, num_perm: int = config.NEAR_DUP_NUM_PERM, threshold: float = config.NEAR_DUP_THRESHOLD,
+                 shingle_size: int = config.NEAR_DUP_SHINGLE_SIZE, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = defaultdict(list)
+        self.signatures: Dict[str, np.ndarray] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        hashes %= _PRIME
+        # (num_perm, 1) x (1, n_shingles) -> min over shingles for every permutation at once
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def signature_matrix(self, texts: List[str]) -> np.ndarray:
+        """Signatures of several texts as one (len(texts), num_perm) array."""
+        matrix = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for i, text in enumerate(texts):
+            matrix[i] = self.signature(text)
+        return matrix
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def insert(self, key: str, signature: np.ndarray):
+        if key in self.signatures:
+            return
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].append(key)
+
+    def query(self, signature: np.ndarray) -> List[Tuple[str, float]]:
+        """Returns (key, estimated Jaccard similarity) for indexed items at or above the threshold."""
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        matches = []
+        for key in candidates:
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda match: -match[1])
+
+
+@lru_cache(maxsize=None)
+def _hasher(num_perm: int, shingle_size: int) -> MinHashLSH:
+    return MinHashLSH(num_perm=num_perm, shingle_size=shingle_size)
+
+
+def minhash_signatures(texts: List[str], num_perm: int, shingle_size: int) -> np.ndarray:
+    """MinHashLSH.signature_matrix with a hasher built once per process; the process pool runs this."""
+    return _hasher(num_perm, shingle_size).signature_matrix(texts)
+
+
+class DuplicateGroup:
+    """Articles that tell the same story. Only the representative goes through the LLM stages."""
+    def __init__(self, representative: NewsArticle):
+        self.representative = representative
+        self.duplicates: List[NewsArticle] = []
+        # Stored category of a matching article from an earlier run, if any.
+        self.archive_category: Optional[str] = None
+
+    @property
+    def members(self) -> List[NewsArticle]:
+        return [self.representative] + self.duplicates
+
+
+class NearDuplicateDetector:
+    """
+    Groups near-duplicate articles (the same wire story from several outlets) within a batch
+    and against the archive. Two articles are near-duplicates when their titles or their
+    summaries are. Signatures are persisted in the state database and indexed in memory,
+    so each lookup only touches the LSH buckets it hashes into.
+    """
+    def __init__(self, db_path: str = config.STATE_DB_PATH):
+        self.lsh = MinHashLSH()
+        self._categories: Dict[str, Optional[str]] = {}
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+        rows = self._conn.execute(
+            "SELECT article_id, category, title_signature, summary_signature FROM near_dup_signatures"
+        ).fetchall()
+        for row in rows:
+            for field, blob in (("t", row["title_signature"]), ("s", row["summary_signature"])):
+                if blob and len(blob) == self.lsh.num_perm * 8:
+                    self.lsh.insert(f"{row['article_id']}#{field}", np.frombuffer(blob, dtype=np.uint64))
+            self._categories[row["article_id"]] = row["category"]
+        print(f"[NearDuplicateDetector] Loaded {len(rows)} archived articles.")
+
+    def _signatures(self, articles: List[NewsArticle]) -> List[Dict[str, np.ndarray]]:
+        """Signatures of every article's title and summary, computed in one batch (in the process pool if enabled)."""
+        keys, texts = [], []
+        for i, article in enumerate(articles):
+            for field, text in article_texts(article.title, article.summary).items():
+                keys.append((i, field))
+                texts.append(text)
+        matrix = process_pool.run("near_dup", minhash_signatures, texts, self.lsh.num_perm, self.lsh.shingle_size,
+                                  size=len(texts))
+        signatures: List[Dict[str, np.ndarray]] = [{} for _ in articles]
+        for (i, field), signature in zip(keys, matrix):
+            signatures[i][field] = signature
+        return signatures
+
+    @staticmethod
+    def _first_match(index: MinHashLSH, signatures: Dict[str, np.ndarray]) -> Optional[str]:
+        """Returns the article id of the best match, comparing titles with titles and summaries with summaries."""
+        best = None
+        for field, signature in signatures.items():
+            for key, similarity in index.query(signature):
+                article_id, matched_field = key.rsplit("#", 1)
+                if matched_field == field and (best is None or similarity > best[1]):
+                    best = (article_id, similarity)
+        return best[0] if best else None
+
+    def group(self, articles: List[NewsArticle]) -> List[DuplicateGroup]:
+        """Splits articles into groups of near-duplicates, keeping their original order."""
+        batch = MinHashLSH(self.lsh.num_perm, self.lsh.threshold, self.lsh.shingle_size)
+        groups: List[DuplicateGroup] = []
+        group_of: Dict[str, DuplicateGroup] = {}
+        all_signatures = self._signatures(articles)
+        with self._lock:
+            for article, signatures in zip(articles, all_signatures):
+                match = self._first_match(batch, signatures)
+                if match:
+                    group = group_of[match]
+                    group.duplicates.append(article)
+                else:
+                    group = DuplicateGroup(article)
+                    groups.append(group)
+                    archived = self._first_match(self.lsh, signatures)
+                    if archived and archived != article.id:
+                        group.archive_category = self._categories.get(archived)
+                for field, signature in signatures.items():
+                    batch.insert(f"{article.id}#{field}", signature)
+                group_of[article.id] = group
+        duplicates = sum(len(group.duplicates) for group in groups)
+        print(f"[NearDuplicateDetector] {len(articles)} articles → {len(groups)} groups ({duplicates} near-duplicates).")
+        return groups
+
+    def add(self, articles: List[NewsArticle]):
+        """Indexes and persists processed articles so later runs can match against them."""
+        rows = []
+        with self._lock:
+            articles = [article for article in articles if article.id not in self._categories]
+        all_signatures = self._signatures(articles)
+        with self._lock:
+            for article, signatures in zip(articles, all_signatures):
+                if article.id in self._categories:
+                    continue
+                for field, signature in signatures.items():
+                    self.lsh.insert(f"{article.id}#{field}", signature)
+                self._categories[article.id] = article.category
+                summary_signature = signatures.get("s")
+                rows.append((
+                    article.id, article.category, signatures["t"].tobytes(),
+                    summary_signature.tobytes() if summary_signature is not None else None, time.time(),
+                ))
+            with self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO near_dup_signatures
+                        (article_id, category, title_signature, summary_signature, created)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+
+
+_detector: Optional[NearDuplicateDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_near_duplicate_detector() -> NearDuplicateDetector:
+    """Returns the shared NearDuplicateDetector."""
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = NearDuplicateDetector()
+        return _detector
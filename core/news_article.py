@@ -1,6 +1,6 @@
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 import time
 import uuid
 
@@ -16,6 +16,14 @@ class NewsArticle(BaseModel):
     summary: Optional[str] = "Not summarized."
     category: Optional[str] = "Uncategorized."
     popularity: int = Field(default=0, description="A score from 0 to 100 indicating popularity.")
+    ranked_at: Optional[float] = Field(default=None, description="When the popularity score was assigned.")
     image: Optional[str] = Field(default=None, description="URL of the article's main image.")
+    duplicate_of: Optional[str] = Field(default=None, description="Id of the article this one is a near-duplicate of.")
+    duplicate_count: int = Field(default=0, description="How many near-duplicates of this article were found.")
+    story_id: Optional[str] = Field(default=None, description="Id of the story (event) this article belongs to.")
+    story_size: int = Field(default=1, description="Number of articles in the story when this one was clustered.")
+    topics: List[str] = Field(default_factory=list, description="Topics whose crawl found this article.")
+    pending: List[str] = Field(default_factory=list, description="Steps ('classify', 'rank') still to be done by a later run.")
+    published_at: Optional[float] = Field(default=None, description="Publication time from the news feed, if known.")
     timestamp: float = Field(default_factory=time.time)
 
@@ -0,0 +1,144 @@
+# core/og_image.py
+import codecs
+import asyncio
+from concurrent.futures import Future, wait
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+import requests
+
+from core import config, deadline
+from core.cache import TTLCache
+from core.executors import get_executor
+from core.http_client import get_http_client
+
+# Preferred order of the image declarations found in a page's <head>.
+_IMAGE_KEYS = ("og:image:secure_url", "og:image", "og:image:url", "twitter:image", "twitter:image:src", "image_src")
+
+
+class _HeadImageParser(HTMLParser):
+    """Collects image meta tags and marks itself done as soon as the <head> is over."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.images: Dict[str, str] = {}
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.done = True
+            return
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or "").strip().lower()
+            if key in _IMAGE_KEYS and attrs.get("content"):
+                self.images.setdefault(key, attrs["content"].strip())
+        elif tag == "link" and (attrs.get("rel") or "").lower() == "image_src" and attrs.get("href"):
+            self.images.setdefault("image_src", attrs["href"].strip())
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+    def best_image(self) -> Optional[str]:
+        for key in _IMAGE_KEYS:
+            if self.images.get(key):
+                return self.images[key]
+        return None
+
+
+class OgImageExtractor:
+    """
+    Finds an article's lead image from its og:image / twitter:image tags.
+    Only the page's <head> is read: the stream is closed right after </head> (or at a byte cap),
+    and results, including misses, are cached per URL.
+    """
+    def __init__(self, max_bytes: int = config.OG_IMAGE_MAX_BYTES, max_workers: int = config.ARTICLE_FETCH_WORKERS):
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.cache = TTLCache(max_size=config.ARTICLE_CACHE_SIZE)
+
+    def _read_head(self, url: str) -> Optional[str]:
+        with get_http_client().stream("GET", url) as response:
+            if response.status_code != 200 or "html" not in response.headers.get("Content-Type", "html").lower():
+                return None
+            # requests reports ISO-8859-1 for any text/* response without an explicit charset.
+            encoding = response.encoding if "charset=" in response.headers.get("Content-Type", "").lower() else "utf-8"
+            try:
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            parser, read = _HeadImageParser(), 0
+            for chunk in response.iter_content(chunk_size=8192):
+                parser.feed(decoder.decode(chunk))
+                read += len(chunk)
+                if parser.done or read >= self.max_bytes:
+                    break
+            image = parser.best_image()
+            return urljoin(response.url, image) if image else None
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Returns the absolute URL of the article's lead image, or None."""
+        cached = self.cache.get(url, default=False)
+        if cached is not False:
+            return cached
+        try:
+            image = self._read_head(url)
+        except (requests.RequestException, deadline.DeadlineExceeded) as e:
+            print(f"[OgImageExtractor] Warning: Could not read {url}. Error: {e}")
+            return None
+        except Exception as e:
+            print(f"[OgImageExtractor] Warning: Could not parse {url}. Error: {e}")
+            image = None
+        self.cache.set(url, image)
+        return image
+
+    def lookup_many(self, urls: List[str], timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Looks up several articles concurrently. URLs not done before the timeout are left out."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        timeout = config.ARTICLE_FETCH_DEADLINE_SECONDS if timeout is None else timeout
+        print(f"[OgImageExtractor] Looking up images for {len(urls)} articles...")
+
+        timeout = deadline.time_left(timeout)
+        futures = self._start(urls, timeout)
+        done, not_done = wait(futures, timeout=timeout)
+        return self._collect(futures, done, not_done)
+
+    async def lookup_many_async(self, urls: List[str], timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """lookup_many for callers in an event loop: waits without holding a thread."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        timeout = config.ARTICLE_FETCH_DEADLINE_SECONDS if timeout is None else timeout
+        print(f"[OgImageExtractor] Looking up images for {len(urls)} articles...")
+
+        timeout = deadline.time_left(timeout)
+        futures = self._start(urls, timeout)
+        wrapped = {asyncio.wrap_future(future): future for future in futures}
+        done, not_done = await asyncio.wait(wrapped, timeout=timeout)
+        return self._collect(futures, {wrapped[f] for f in done}, {wrapped[f] for f in not_done})
+
+    def _start(self, urls: List[str], timeout: Optional[float]) -> Dict[Future, str]:
+        # Lookups share the http executor; one batch uses at most max_workers of its threads.
+        return dict(zip(get_executor("http").fan_out(self.lookup, urls, limit=self.max_workers, timeout=timeout), urls))
+
+    @staticmethod
+    def _collect(futures: Dict[Future, str], done, not_done) -> Dict[str, Optional[str]]:
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            print(f"[OgImageExtractor] Warning: {len(not_done)} lookups missed the deadline.")
+        return {futures[future]: future.result() for future in done}
+
+
+_extractor: Optional[OgImageExtractor] = None
+
+
+def get_og_image_extractor() -> OgImageExtractor:
+    """Returns the shared OgImageExtractor, so its cache lives as long as the process."""
+    global _extractor
+    if _extractor is None:
+        _extractor = OgImageExtractor()
+    return _extractor
@@ -0,0 +1,144 @@
+# core/popularity.py
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from core import config, state_db
+from core.near_dup import article_texts
+from core.news_article import NewsArticle
+
+FEATURES = ["source", "recency", "story", "duplicates", "velocity"]
+# An article's velocity is the mean of its fastest-rising title terms.
+_VELOCITY_TOP_TERMS = 3
+
+
+def parse_published(value) -> Optional[float]:
+    """
+    Parses a feed date ('Mon, 13 Oct 2025 07:00:00 GMT', possibly without the time or zone)
+    or a timestamp; None if it is neither. Dates without a zone are taken as UTC.
+    """
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        parsed = parsedate_to_datetime(value.strip())
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.strptime(value.strip(), "%a, %d %b %Y")
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def decayed_popularity(articles: List[Dict], now: Optional[float] = None) -> np.ndarray:
+    """
+    The effective popularity of stored articles (dicts) at query time: the score assigned when
+    the article was ranked, halved every POPULARITY_HALF_LIFE_HOURS since then.
+    """
+    if not articles:
+        return np.zeros(0)
+    now = now or time.time()
+    popularity = np.array([a.get("popularity") or 0 for a in articles], dtype=float)
+    ranked_at = np.array([a.get("ranked_at") or a.get("timestamp") or now for a in articles], dtype=float)
+    age_hours = np.maximum(now - ranked_at, 0) / 3600
+    return popularity * np.exp2(-age_hours / config.POPULARITY_HALF_LIFE_HOURS)
+
+
+def _title_terms(title: str) -> Set[str]:
+    text = article_texts(title, None)["t"]
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class PopularityModel:
+    """
+    Estimates popularity without an LLM from signals the pipeline already has: how reputable
+    the source is, how fresh the article is, how large its story and near-duplicate group are,
+    and how fast its title terms are rising compared with the previous trend window.
+    All articles of a run are scored at once with NumPy.
+    """
+    def __init__(self, db_path: str = config.STATE_DB_PATH):
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+        self.weights = np.array([config.RANK_LOCAL_WEIGHTS[name] for name in FEATURES])
+
+    def _trend_counts(self, now: float) -> tuple:
+        """Document frequencies of title terms in the current and the previous trend window."""
+        window = config.RANK_TREND_WINDOW_HOURS * 3600
+        recent: Counter = Counter()
+        previous: Counter = Counter()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, first_seen FROM seen_articles WHERE first_seen >= ?", (now - 2 * window,)
+            ).fetchall()
+        for row in rows:
+            (recent if row["first_seen"] >= now - window else previous).update(_title_terms(row["title"]))
+        return recent, previous
+
+    def features(self, articles: List[NewsArticle], now: Optional[float] = None) -> np.ndarray:
+        """Returns the (articles, FEATURES) feature matrix."""
+        now = now or time.time()
+        source_weight = np.array([config.SOURCE_WEIGHTS.get(a.source or "", 1.0) for a in articles])
+        published = np.array([a.published_at or a.timestamp for a in articles], dtype=float)
+        age_hours = np.maximum(now - published, 0) / 3600
+        story_size = np.array([a.story_size for a in articles], dtype=float)
+        duplicates = np.array([a.duplicate_count for a in articles], dtype=float)
+
+        # Keyword velocity: log growth of each term between trend windows, counting this run as recent.
+        terms = [_title_terms(a.title) for a in articles]
+        recent, previous = self._trend_counts(now)
+        for article_terms in terms:
+            recent.update(article_terms)
+        vocabulary: Dict[str, int] = {}
+        rows, cols = [], []
+        for i, article_terms in enumerate(terms):
+            for term in article_terms:
+                rows.append(i)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+        growth = np.zeros(max(len(vocabulary), 1))
+        if vocabulary:
+            vocab = list(vocabulary)
+            growth[:len(vocab)] = np.log((np.array([recent[t] for t in vocab]) + 1.0) /
+                                         (np.array([previous[t] for t in vocab]) + 1.0))
+        # Terms that are not rising contribute nothing, so missing terms (zeros) are harmless padding.
+        per_term = np.zeros((len(articles), max(len(vocabulary), 1)))
+        if rows:
+            per_term[rows, cols] = np.maximum(growth[cols], 0)
+        top = -np.sort(-per_term, axis=1)[:, :_VELOCITY_TOP_TERMS]
+        velocity = top.mean(axis=1)
+
+        return np.column_stack([
+            np.log(source_weight),
+            np.exp(-age_hours * math.log(2) / config.RANK_RECENCY_HALF_LIFE_HOURS),
+            np.log1p(np.maximum(story_size - 1, 0)),
+            np.log1p(duplicates),
+            velocity,
+        ])
+
+    def score(self, articles: List[NewsArticle], now: Optional[float] = None) -> np.ndarray:
+        """Returns a 0-100 popularity score for each article."""
+        if not articles:
+            return np.zeros(0)
+        logits = config.RANK_LOCAL_BIAS + self.features(articles, now) @ self.weights
+        return 100.0 / (1.0 + np.exp(-logits))
+
+
+_model: Optional[PopularityModel] = None
+_model_lock = threading.Lock()
+
+
+def get_popularity_model() -> PopularityModel:
+    """Returns the shared PopularityModel."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = PopularityModel()
+        return _model
@@ -0,0 +1,134 @@
+# core/process_pool.py
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from core import config, deadline
+
+
+def _warm():
+    """Worker initializer: loads NumPy and builds the MinHash hasher before the first batch arrives."""
+    from core.near_dup import minhash_signatures
+    minhash_signatures([], config.NEAR_DUP_NUM_PERM, config.NEAR_DUP_SHINGLE_SIZE)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ProcessPool:
+    """
+    Long-lived worker processes for CPU-bound batch work (MinHash signatures, n-gram features),
+    so it runs outside the API process's GIL. Workers are started once and keep their hashers
+    built; batches go in as lists of strings and come back as NumPy arrays, which pickle as
+    single buffers.
+
+    If the pool breaks (a worker died), work falls back to the calling thread for the rest of
+    the process's life.
+    """
+    def __init__(self, workers: int = config.PROCESS_POOL_WORKERS, start_method: str = config.PROCESS_POOL_START_METHOD):
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context(start_method), initializer=_warm
+        )
+        self._lock = threading.Lock()
+        self._broken = False
+        self._stats = {"tasks": 0, "items": 0, "failed": 0, "fallbacks": 0, "seconds": 0.0}
+
+    def start(self):
+        """Starts the workers and waits until they are warm. Forked workers should start before other threads do."""
+        pids = {future.result() for future in [self._pool.submit(_ping) for _ in range(self.workers)]}
+        print(f"[ProcessPool] {len(pids)} worker processes ready.")
+
+    def _fallback(self, error: BaseException, fn: Callable, args) -> Any:
+        with self._lock:
+            self._broken = True
+            self._stats["fallbacks"] += 1
+        print(f"[ProcessPool] Warning: Process pool unavailable ({error}); computing in-process.")
+        return fn(*args)
+
+    def run(self, fn: Callable, *args, size: int = 1) -> Any:
+        """
+        Runs fn(*args) in a worker and waits for it, no longer than the current run's deadline.
+        fn must be a module-level function, and its arguments and result picklable.
+        """
+        if self._broken:
+            return fn(*args)
+        started = time.monotonic()
+        try:
+            future = self._pool.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            return self._fallback(e, fn, args)
+        try:
+            result = future.result(timeout=deadline.time_left())
+        except BrokenProcessPool as e:
+            return self._fallback(e, fn, args)
+        except FutureTimeoutError:
+            future.cancel()
+            deadline.check()
+            raise
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        with self._lock:
+            self._stats["tasks"] += 1
+            self._stats["items"] += size
+            self._stats["seconds"] += time.monotonic() - started
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["seconds"] = round(stats["seconds"], 3)
+        return {"workers": self.workers, "broken": self._broken, **stats}
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_pool: Optional[ProcessPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> Optional[ProcessPool]:
+    """Returns the shared ProcessPool, or None when PROCESS_POOL_ENABLED is off."""
+    global _pool
+    if not config.PROCESS_POOL_ENABLED:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool()
+        return _pool
+
+
+def run(task: str, fn: Callable, *args, size: int) -> Any:
+    """
+    Runs fn(*args) in the process pool when `task` is listed in PROCESS_POOL_TASKS and the batch
+    has at least PROCESS_POOL_MIN_BATCH items, and in the calling thread otherwise.
+    """
+    pool = get_process_pool() if task in config.PROCESS_POOL_TASKS and size >= config.PROCESS_POOL_MIN_BATCH else None
+    if pool is None:
+        return fn(*args)
+    return pool.run(fn, *args, size=size)
+
+
+def process_pool_stats() -> Optional[Dict]:
+    """Returns the pool's task metrics, or None if it is not in use."""
+    with _pool_lock:
+        pool = _pool
+    return pool.stats() if pool else None
+
+
+def shutdown_process_pool():
+    """Stops the worker processes; queued batches are cancelled."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(wait=False)
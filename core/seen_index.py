@@ -0,0 +1,102 @@
+# core/seen_index.py
+import threading
+import time
+from typing import Dict, List, Optional
+
+from core import config, state_db
+from core.bloom_filter import ScalableBloomFilter
+from core.news_article import NewsArticle
+from core.url_utils import canonicalize_url
+
+# SQLite limits the number of bound parameters per statement.
+_LOOKUP_CHUNK = 500
+
+
+class SeenIndex:
+    """
+    A persistent index of articles that have already been through the pipeline, keyed by
+    canonical URL. CommanderAgent checks it before classification so a story that shows up
+    again keeps its stored id, category and summary instead of paying for new LLM calls.
+
+    A Bloom filter of the same URLs sits in front of SQLite: URLs it has never seen are
+    answered without touching the database, and only possible matches are looked up.
+    """
+    def __init__(self, db_path: str = config.STATE_DB_PATH, bloom_path: str = config.SEEN_BLOOM_PATH):
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+        self.bloom = ScalableBloomFilter(bloom_path, config.SEEN_BLOOM_CAPACITY, config.SEEN_BLOOM_ERROR_RATE)
+        if not len(self.bloom):
+            # First start with this filter: seed it from the rows recorded so far.
+            urls = [row[0] for row in self._conn.execute("SELECT canonical_url FROM seen_articles")]
+            if urls:
+                print(f"[SeenIndex] Seeding the Bloom filter with {len(urls)} known URLs...")
+                self.bloom.update(urls)
+
+    def maybe_seen(self, url: str) -> bool:
+        """False means the URL is definitely new; True means it probably is not."""
+        return canonicalize_url(url) in self.bloom
+
+    def known_urls(self, urls: List[str]) -> List[str]:
+        """Returns the given URLs that are confirmed to have been processed before."""
+        return list(self.lookup_many(urls))
+
+    def lookup_many(self, urls: List[str]) -> Dict[str, Dict]:
+        """Returns the stored record of every known URL, keyed by the URL as given."""
+        canonical = {url: canonicalize_url(url) for url in urls}
+        keys = [key for key in set(canonical.values()) if key in self.bloom]
+        rows = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT * FROM seen_articles WHERE canonical_url IN ({placeholders})", chunk
+                ):
+                    rows[row["canonical_url"]] = dict(row)
+        return {url: rows[key] for url, key in canonical.items() if key in rows}
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        return self.lookup_many([url]).get(url)
+
+    def remember(self, articles: List[NewsArticle]):
+        """Records processed articles, keeping the first-seen time of ones already known."""
+        now = time.time()
+        rows = [
+            (canonicalize_url(a.url), a.id, a.title, a.summary, a.category, a.image, a.popularity, now, now)
+            for a in articles
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO seen_articles
+                    (canonical_url, article_id, title, summary, category, image, popularity, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(canonical_url) DO UPDATE SET
+                    article_id = excluded.article_id,
+                    title = excluded.title,
+                    summary = excluded.summary,
+                    category = excluded.category,
+                    image = COALESCE(excluded.image, seen_articles.image),
+                    popularity = excluded.popularity,
+                    last_seen = excluded.last_seen
+                """,
+                rows,
+            )
+        self.bloom.update(row[0] for row in rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_articles").fetchone()[0]
+
+
+_index: Optional[SeenIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_seen_index() -> SeenIndex:
+    """Returns the shared, process-wide SeenIndex."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SeenIndex()
+        return _index
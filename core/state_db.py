@@ -0,0 +1,44 @@
+# core/state_db.py
+import os
+import sqlite3
+import threading
+from core import config
+
+_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "schema.sql")
+_initialized = set()
+_init_lock = threading.Lock()
+
+# Columns added to tables after they were first created; CREATE TABLE IF NOT EXISTS leaves
+# existing tables as they are, so these are added to older databases on first connect.
+_ADDED_COLUMNS = {
+    "pipeline_runs": {"owner": "TEXT", "heartbeat": "REAL"},
+    "pipeline_jobs": {"run_id": "TEXT", "heartbeat": "REAL"},
+}
+
+
+def _add_missing_columns(conn: sqlite3.Connection):
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, column_type in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+def connect(db_path: str = config.STATE_DB_PATH) -> sqlite3.Connection:
+    """
+    Opens a connection to the pipeline state database, creating the tables from
+    database/schema.sql the first time a process touches the file.
+    The connection may be shared across threads; callers serialize access with their own lock.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _init_lock:
+        if db_path not in _initialized:
+            with open(_SCHEMA_PATH, encoding="utf-8") as f:
+                conn.executescript(f.read())
+            _add_missing_columns(conn)
+            _initialized.add(db_path)
+    return conn
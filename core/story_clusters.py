@@ -0,0 +1,203 @@
+# core/story_clusters.py
+import json
+import math
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from core import config, state_db
+from core.near_dup import article_texts
+from core.news_article import NewsArticle
+
+# Each story keeps only its heaviest terms, so its vector stays small however large it grows.
+_MAX_CENTROID_TERMS = 300
+_TITLE_WEIGHT = 2.0
+
+
+def _term_vector(title: str, summary: Optional[str]) -> Counter:
+    """Character-bigram counts of an article, with title bigrams weighted up."""
+    vector: Counter = Counter()
+    for field, text in article_texts(title, summary).items():
+        weight = _TITLE_WEIGHT if field == "t" else 1.0
+        for i in range(len(text) - 1):
+            vector[text[i:i + 2]] += weight
+    return vector
+
+
+class _Story:
+    def __init__(self, story_id: str, title: str, size: int, created: float, updated: float, centroid: Dict[str, float]):
+        self.story_id = story_id
+        self.title = title
+        self.size = size
+        self.created = created
+        self.updated = updated
+        self.centroid = Counter(centroid)
+
+    def absorb(self, vector: Counter) -> Set[str]:
+        """Adds an article's vector to the centroid and returns the terms trimmed from it."""
+        self.centroid.update(vector)
+        trimmed: Set[str] = set()
+        if len(self.centroid) > _MAX_CENTROID_TERMS:
+            kept = dict(self.centroid.most_common(_MAX_CENTROID_TERMS))
+            trimmed = set(self.centroid) - set(kept)
+            self.centroid = Counter(kept)
+        self.size += 1
+        self.updated = time.time()
+        return trimmed
+
+
+class StoryClusterer:
+    """
+    Groups articles into stories (events) that persist across pipeline runs.
+
+    Stories updated within the last STORY_WINDOW_HOURS stay in an in-memory inverted index
+    from bigram to story. A new article is scored (TF-IDF cosine) only against the stories
+    that share its less common terms, then joins the best one above the threshold or starts
+    a new story. Nothing is ever re-clustered.
+    """
+    def __init__(self, db_path: str = config.STATE_DB_PATH):
+        self.threshold = config.STORY_SIMILARITY_THRESHOLD
+        self.window_seconds = config.STORY_WINDOW_HOURS * 3600
+        self._conn = state_db.connect(db_path)
+        self._lock = threading.Lock()
+        self._stories: Dict[str, _Story] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        cutoff = time.time() - self.window_seconds
+        for row in self._conn.execute("SELECT * FROM stories WHERE updated >= ?", (cutoff,)):
+            self._index(_Story(row["story_id"], row["title"], row["size"], row["created"], row["updated"],
+                               json.loads(row["centroid"])))
+        print(f"[StoryClusterer] Loaded {len(self._stories)} active stories.")
+
+    def _index(self, story: _Story):
+        self._stories[story.story_id] = story
+        for term in story.centroid:
+            self._postings[term].add(story.story_id)
+
+    def _unpost(self, term: str, story_id: str):
+        postings = self._postings.get(term)
+        if postings is not None:
+            postings.discard(story_id)
+            if not postings:
+                del self._postings[term]
+
+    def _evict_stale(self):
+        cutoff = time.time() - self.window_seconds
+        for story_id in [s.story_id for s in self._stories.values() if s.updated < cutoff]:
+            for term in self._stories.pop(story_id).centroid:
+                self._unpost(term, story_id)
+
+    def _idf(self, term: str) -> float:
+        return math.log((len(self._stories) + 1) / (len(self._postings.get(term, ())) + 1)) + 1
+
+    def _cosine(self, vector: Counter, centroid: Counter) -> float:
+        dot = sum(weight * centroid.get(term, 0) * self._idf(term) ** 2 for term, weight in vector.items())
+        if not dot:
+            return 0.0
+        norm_a = math.sqrt(sum((w * self._idf(t)) ** 2 for t, w in vector.items()))
+        norm_b = math.sqrt(sum((w * self._idf(t)) ** 2 for t, w in centroid.items()))
+        return dot / (norm_a * norm_b)
+
+    def _best_story(self, vector: Counter) -> Optional[_Story]:
+        # Terms shared by more than half of the active stories say nothing about which story this is.
+        common = max(2, len(self._stories) // 2)
+        candidates = set()
+        for term in vector:
+            postings = self._postings.get(term)
+            if postings and len(postings) <= common:
+                candidates |= postings
+        best, best_score = None, self.threshold
+        for story_id in candidates:
+            if story_id not in self._stories:
+                continue
+            score = self._cosine(vector, self._stories[story_id].centroid)
+            if score >= best_score:
+                best, best_score = self._stories[story_id], score
+        return best
+
+    def assign(self, articles: List[NewsArticle]):
+        """
+        Sets story_id and story_size on every article. Articles already clustered keep their
+        story, near-duplicates join their representative's story, and the rest are matched.
+        """
+        ids = [article.id for article in articles]
+        with self._lock:
+            self._evict_stale()
+            placeholders = ",".join("?" * len(ids))
+            known = dict(self._conn.execute(
+                f"SELECT article_id, story_id FROM story_members WHERE article_id IN ({placeholders})", ids
+            ).fetchall()) if ids else {}
+
+            story_of: Dict[str, str] = {}
+            touched: Dict[str, _Story] = {}
+            members = []
+            for article in sorted(articles, key=lambda a: a.duplicate_of is not None):
+                story_id = known.get(article.id) or story_of.get(article.duplicate_of or "")
+                vector = _term_vector(article.title, article.summary)
+                story = self._stories.get(story_id) if story_id else None
+                if story_id and story is None:
+                    # Clustered in an earlier run, but the story has left the active window.
+                    story_of[article.id] = story_id
+                    continue
+                if story is None:
+                    story = self._best_story(vector)
+                if story is None:
+                    story = _Story(str(uuid.uuid4()), article.title, 0, time.time(), time.time(), {})
+                if article.id not in known:
+                    # Only terms that stay in the centroid are posted, so eviction removes them all.
+                    for term in story.absorb(vector):
+                        self._unpost(term, story.story_id)
+                    for term in vector:
+                        if term in story.centroid:
+                            self._postings[term].add(story.story_id)
+                    self._stories[story.story_id] = story
+                    members.append((article.id, story.story_id))
+                story_of[article.id] = story.story_id
+                touched[story.story_id] = story
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO story_members (article_id, story_id) VALUES (?, ?)", members
+                )
+                self._conn.executemany(
+                    """
+                    INSERT INTO stories (story_id, title, size, created, updated, centroid)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(story_id) DO UPDATE SET
+                        size = excluded.size, updated = excluded.updated, centroid = excluded.centroid
+                    """,
+                    [(s.story_id, s.title, s.size, s.created, s.updated, json.dumps(s.centroid, ensure_ascii=False))
+                     for s in touched.values()],
+                )
+
+            for article in articles:
+                article.story_id = story_of.get(article.id)
+                story = self._stories.get(article.story_id)
+                article.story_size = story.size if story else 1
+        print(f"[StoryClusterer] {len(articles)} articles in {len(set(story_of.values()))} stories "
+              f"({len(members)} newly clustered).")
+
+    def sizes(self, story_ids: List[str]) -> Dict[str, int]:
+        """Returns the current size of each given story."""
+        story_ids = [story_id for story_id in set(story_ids) if story_id]
+        if not story_ids:
+            return {}
+        placeholders = ",".join("?" * len(story_ids))
+        with self._lock:
+            return dict(self._conn.execute(
+                f"SELECT story_id, size FROM stories WHERE story_id IN ({placeholders})", story_ids
+            ).fetchall())
+
+
+_clusterer: Optional[StoryClusterer] = None
+_clusterer_lock = threading.Lock()
+
+
+def get_story_clusterer() -> StoryClusterer:
+    """Returns the shared StoryClusterer."""
+    global _clusterer
+    with _clusterer_lock:
+        if _clusterer is None:
+            _clusterer = StoryClusterer()
+        return _clusterer
@@ -0,0 +1,45 @@
+# core/system.py
+from typing import Dict, Tuple
+
+from core import config
+from core.a2a_bus import A2ABus
+from core.llm_client import LLMClient
+from core.mcp_registry import MCPRegistry
+
+from agents.commander_agent import CommanderAgent
+from agents.crawler_agent import CrawlerAgent
+from agents.classifier_agent import ClassifierAgent
+from agents.ranker_agent import RankerAgent
+from agents.storage_agent import StorageAgent
+
+
+def create_agents(pipeline: bool = True) -> Tuple[A2ABus, MCPRegistry]:
+    """
+    Instantiates the agents and registers them on a new A2A bus and MCP registry; shared by the
+    API server (main.py) and the pipeline worker (scheduler/daily_scheduler.py).
+    With pipeline=False only the StorageAgent is created, for processes that just read the news.
+    """
+    a2a_bus = A2ABus()
+    mcp_registry = MCPRegistry()
+    print("[System] Initializing and registering agents...")
+
+    # 使用 Agent 內部呼叫時的 'snake_case' 名稱進行註冊
+    # 這些名稱必須與 agent 程式碼中 a2a_bus.send() 裡的接收者名稱完全匹配
+    agents: Dict[str, object] = {"storage_agent": StorageAgent(storage_path=config.STORAGE_PATH)}
+    if pipeline:
+        llm_client = LLMClient(model=config.LLM_MODEL, api_key=config.GEMINI_API_KEY)
+        agents.update({
+            "commander_agent": CommanderAgent(a2a_bus),
+            "crawler_agent": CrawlerAgent(a2a_bus, llm_client),
+            "classifier_agent": ClassifierAgent(llm_client),
+            "ranker_agent": RankerAgent(llm_client),
+        })
+
+    # 註冊到 A2A Bus 和 MCP Registry
+    for name, agent_instance in agents.items():
+        a2a_bus.register(name, agent_instance)
+        mcp_registry.register(name, agent_instance)
+        print(f"- Agent '{name}' registered.")
+
+    print("[System] All agents are ready.")
+    return a2a_bus, mcp_registry
@@ -1,53 +1,250 @@
 # core/tools.py
+import calendar
+import time
 import feedparser
 import requests
+from concurrent.futures import wait
+from typing import List, Dict, Optional
 from urllib.parse import quote
+from core import config
+from core import deadline as run_deadline
+from core.executors import get_executor
+from core.http_client import get_http_client
+from core.compaction import compact_search_results, truncate_to_tokens
+from core.article_fetcher import get_article_fetcher
+from core.url_utils import canonicalize_url
+from core.seen_index import get_seen_index
+
+def _build_feed_url(query: str, locale: Dict[str, str]) -> str:
+    """Builds a Google News RSS search URL for the given query and locale."""
+    encoded_query = quote(query)
+    return (
+        f"https://news.google.com/rss/search?q={encoded_query}"
+        f"&hl={locale['hl']}&gl={locale['gl']}&ceid={locale['ceid']}"
+    )
+
+
+def _fetch_feed_entries(query: str, locale: Dict[str, str]) -> list:
+    """Fetches and parses one RSS feed, returning its entries."""
+    url = _build_feed_url(query, locale)
+    response = get_http_client().get(url)
+    response.raise_for_status()
+    feed = feedparser.parse(response.content, response_headers=dict(response.headers))
+    if feed.bozo:
+        print(f"[google_web_search] Warning: Feed from {url} is not well-formed. Bozo reason: {feed.bozo_exception}")
+    return feed.entries
+
+
+def _resolve_final_url(url: str) -> str:
+    """Follows redirects to get the final URL, falling back to the original link."""
+    try:
+        response = get_http_client().head(url, allow_redirects=True)
+        # Check for a successful status code
+        if response.status_code == 200:
+            return response.url
+        print(f"[google_web_search] Warning: Received status code {response.status_code} for {url}")
+    except (requests.RequestException, run_deadline.DeadlineExceeded) as e:
+        print(f"[google_web_search] Warning: Could not resolve final URL for {url}. Error: {e}")
+    return url
+
+
+def _resolve_final_urls(urls: List[str], timeout: Optional[float] = None) -> Dict[str, str]:
+    """Resolves redirect links concurrently. Links not resolved before the timeout map to themselves."""
+    resolved = {url: url for url in urls}
+    if not urls:
+        return resolved
+
+    timeout = run_deadline.time_left(timeout)
+    futures = dict(zip(
+        get_executor("http").fan_out(_resolve_final_url, urls, limit=config.SEARCH_MAX_WORKERS, timeout=timeout), urls
+    ))
+    done, not_done = wait(futures, timeout=timeout)
+    for future in not_done:
+        future.cancel()
+    for future in done:
+        resolved[futures[future]] = future.result()
+    return resolved
+
+
+def _entry_to_result(entry) -> Dict:
+    return {
+        "title": entry.get("title", "No Title"),
+        "link": entry.get("link", "#"),
+        "summary": entry.get("summary", "No Summary"),
+        "published": entry.get("published", "No Date"),
+        "source": entry.source.get("title") if hasattr(entry, 'source') else "Unknown Source"
+    }
+
+
+def _drop_seen(results: List[Dict]) -> List[Dict]:
+    """Removes results whose articles were already processed, if config.SEARCH_SKIP_SEEN is on."""
+    if not config.SEARCH_SKIP_SEEN or not results:
+        return results
+    seen = set(get_seen_index().known_urls([result["link"] for result in results]))
+    if seen:
+        print(f"[google_web_search] Skipping {len(seen)} already processed articles.")
+    return [result for result in results if result["link"] not in seen]
+
+
+def _published_ts(entry) -> float:
+    parsed = entry.get("published_parsed")
+    return float(calendar.timegm(parsed)) if parsed else 0.0
+
 
 def google_web_search(query: str) -> dict:
     """Performs a web search using the Google News RSS feed and returns the results.
     This tool is useful for finding information on the internet based on a query.
-    
+
     Args:
         query: The search query to find information on the web.
-        
+
     Returns:
         A dictionary containing the search results.
     """
-    encoded_query = quote(query)
-    url = f"https://news.google.com/rss/search?q={encoded_query}&hl=zh-TW&gl=TW&ceid=TW:zh-Hant"
-    
     try:
-        feed = feedparser.parse(url)
-        if feed.bozo:
-            print(f"[google_web_search] Warning: Feed from {url} is not well-formed. Bozo reason: {feed.bozo_exception}")
-
-        results = []
-        session = requests.Session()
-        for entry in feed.entries[:30]:
-            final_url = entry.get("link", "#")
-            try:
-                # Follow redirect to get the final URL
-                response = session.head(final_url, allow_redirects=True, timeout=10)
-                # Check for a successful status code
-                if response.status_code == 200:
-                    final_url = response.url
-                else:
-                    print(f"[google_web_search] Warning: Received status code {response.status_code} for {final_url}")
-            except requests.RequestException as e:
-                print(f"[google_web_search] Warning: Could not resolve final URL for {final_url}. Error: {e}")
-
-            results.append({
-                "title": entry.get("title", "No Title"),
-                "link": final_url, # Use the resolved, final URL
-                "summary": entry.get("summary", "No Summary"),
-                "published": entry.get("published", "No Date"),
-                "source": entry.source.get("title") if hasattr(entry, 'source') else "Unknown Source"
-            })
-        
+        entries = _fetch_feed_entries(query, config.SEARCH_LOCALES[0])[:30]
+        results = [_entry_to_result(entry) for entry in entries]
+
+        # Follow redirects to get the final URLs
+        resolved = _resolve_final_urls([result["link"] for result in results])
+        for result in results:
+            result["link"] = resolved[result["link"]] # Use the resolved, final URL
+        results = _drop_seen(results)
+
         if not results:
             return {"results": "No articles found for the query."}
-            
-        return {"results": results}
+
+        return {"results": compact_search_results(results)}
     except Exception as e:
         print(f"[google_web_search] An unexpected error occurred: {e}")
         return {"results": f"An error occurred while trying to fetch news: {e}"}
+
+
+def fanout_search(
+    queries: List[str],
+    locales: Optional[List[Dict[str, str]]] = None,
+    max_results: Optional[int] = None,
+    deadline_seconds: Optional[float] = None,
+) -> List[Dict]:
+    """
+    Fetches the feeds for every query × locale combination concurrently, merges the entries
+    by canonical URL and returns one ranked candidate list.
+
+    Candidates found by more queries/locales rank first, then newer ones, then those listed
+    higher in their feed. Feeds that have not answered when the deadline passes are skipped.
+    """
+    locales = locales or config.SEARCH_LOCALES
+    max_results = max_results or config.SEARCH_MAX_RESULTS
+    deadline = time.monotonic() + (deadline_seconds or config.SEARCH_DEADLINE_SECONDS)
+
+    jobs = [(query, locale) for query in dict.fromkeys(queries) if query for locale in locales]
+    if not jobs:
+        return []
+    print(f"[fanout_search] Fetching {len(jobs)} feeds ({len(queries)} queries × {len(locales)} locales)...")
+
+    timeout = run_deadline.time_left(max(0.0, deadline - time.monotonic()))
+    futures = dict(zip(
+        get_executor("http").fan_out(lambda job: _fetch_feed_entries(*job), jobs, limit=config.SEARCH_MAX_WORKERS,
+                                     timeout=timeout),
+        jobs,
+    ))
+    done, not_done = wait(futures, timeout=timeout)
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        print(f"[fanout_search] Warning: {len(not_done)} feeds missed the deadline and were skipped.")
+
+    candidates: Dict[str, Dict] = {}
+    for future in done:
+        query, locale = futures[future]
+        try:
+            entries = future.result()
+        except Exception as e:
+            print(f"[fanout_search] Warning: Feed for '{query}' ({locale['gl']}) failed: {e}")
+            continue
+        for position, entry in enumerate(entries):
+            result = _entry_to_result(entry)
+            key = canonicalize_url(result["link"])
+            candidate = candidates.get(key)
+            if candidate is None:
+                candidate = candidates[key] = {
+                    **result, "hits": 0, "queries": [], "locales": [],
+                    "_published_ts": _published_ts(entry), "_best_position": position,
+                }
+            candidate["hits"] += 1
+            candidate["_best_position"] = min(candidate["_best_position"], position)
+            if query not in candidate["queries"]:
+                candidate["queries"].append(query)
+            if locale["gl"] not in candidate["locales"]:
+                candidate["locales"].append(locale["gl"])
+
+    ranked = sorted(
+        candidates.values(),
+        key=lambda c: (-c["hits"], -c["_published_ts"], c["_best_position"]),
+    )[:max_results]
+
+    # Resolve the redirect links of the survivors only, within what is left of the deadline.
+    resolved = _resolve_final_urls(
+        [candidate["link"] for candidate in ranked],
+        timeout=max(0.0, deadline - time.monotonic()),
+    )
+    merged: Dict[str, Dict] = {}
+    for candidate in ranked:
+        candidate["link"] = resolved[candidate["link"]]
+        candidate.pop("_published_ts")
+        candidate.pop("_best_position")
+        key = canonicalize_url(candidate["link"])
+        if key not in merged:
+            merged[key] = candidate
+            continue
+        # Different feed links that redirect to the same article
+        kept = merged[key]
+        kept["hits"] += candidate["hits"]
+        kept["queries"] += [q for q in candidate["queries"] if q not in kept["queries"]]
+        kept["locales"] += [l for l in candidate["locales"] if l not in kept["locales"]]
+    results = _drop_seen(list(merged.values()))
+
+    print(f"[fanout_search] Merged {len(candidates)} unique entries into {len(results)} candidates.")
+    return results
+
+
+def google_multi_search(queries: list[str]) -> dict:
+    """Searches Google News for several queries at once, across all configured languages and regions.
+    Use this for broad topics: pass the topic together with its synonyms or related phrasings.
+    Results are merged, de-duplicated and ranked, with articles found by more queries listed first.
+
+    Args:
+        queries: The search queries, e.g. the topic plus a few synonyms or translations.
+
+    Returns:
+        A dictionary containing the merged search results.
+    """
+    try:
+        results = fanout_search([str(query) for query in queries])
+        if not results:
+            return {"results": "No articles found for the queries."}
+        return {"results": compact_search_results(results)}
+    except Exception as e:
+        print(f"[google_multi_search] An unexpected error occurred: {e}")
+        return {"results": f"An error occurred while trying to fetch news: {e}"}
+
+
+def fetch_article_texts(urls: list[str]) -> dict:
+    """Downloads several news articles at once and returns the main text of each page.
+    Call this once with the URLs of all the articles you picked, so summaries are based on the real content.
+
+    Args:
+        urls: The article URLs, exactly as returned by the search tools.
+
+    Returns:
+        A dictionary mapping each URL to an excerpt of its article text (empty if the page could not be read).
+    """
+    try:
+        texts = get_article_fetcher().fetch_many([str(url) for url in urls])
+        return {"articles": [
+            {"url": str(url), "text": truncate_to_tokens(texts.get(str(url), ""), config.ARTICLE_EXCERPT_TOKENS)}
+            for url in urls
+        ]}
+    except Exception as e:
+        print(f"[fetch_article_texts] An unexpected error occurred: {e}")
+        return {"articles": f"An error occurred while trying to fetch articles: {e}"}
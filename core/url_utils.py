@@ -0,0 +1,54 @@
+# core/url_utils.py
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that describe how a link was reached, not what it points to.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "referrer", "spm", "cmpid", "ncid", "ocid", "oc", "ito", "_ga",
+}
+# Google News adds its UI language to every article link.
+_GOOGLE_NEWS_PARAMS = {"hl", "gl", "ceid"}
+_GOOGLE_REDIRECT_HOSTS = {"google.com", "www.google.com", "news.google.com", "www.google.com.tw"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(key: str, host: str) -> bool:
+    key = key.lower()
+    if key.startswith("utm_") or key in TRACKING_PARAMS:
+        return True
+    return host == "news.google.com" and key in _GOOGLE_NEWS_PARAMS
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes an article URL so that links to the same page compare equal:
+    unwraps google.com/url redirects, lowercases scheme and host, drops default ports,
+    fragments, tracking parameters and trailing slashes, and sorts the remaining query.
+    """
+    url = (url or "").strip()
+    for _ in range(3):  # Redirect wrappers can be nested
+        parts = urlsplit(url)
+        if parts.netloc.lower() in _GOOGLE_REDIRECT_HOSTS and parts.path == "/url":
+            params = dict(parse_qsl(parts.query))
+            target = params.get("q") or params.get("url")
+            if target and target.startswith(("http://", "https://")):
+                url = target
+                continue
+        break
+
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(key, host)
+    ]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ""))
@@ -10,3 +10,103 @@ CREATE TABLE IF NOT EXISTS news (
 
 CREATE INDEX IF NOT EXISTS idx_category ON news(category);
 CREATE INDEX IF NOT EXISTS idx_created_at ON news(created_at);
+
+-- 已處理過的文章 (以正規化網址為鍵)，讓重複出現的文章沿用既有的分類與摘要
+CREATE TABLE IF NOT EXISTS seen_articles (
+    canonical_url TEXT PRIMARY KEY,
+    article_id TEXT NOT NULL,
+    title TEXT,
+    summary TEXT,
+    category TEXT,
+    image TEXT,
+    popularity INTEGER DEFAULT 0,
+    first_seen REAL,
+    last_seen REAL
+);
+
+-- 近似重複偵測用的 MinHash 簽章 (uint64 陣列)，標題與摘要分別比對
+CREATE TABLE IF NOT EXISTS near_dup_signatures (
+    article_id TEXT PRIMARY KEY,
+    category TEXT,
+    title_signature BLOB NOT NULL,
+    summary_signature BLOB,
+    created REAL
+);
+
+-- 跨次執行持續累積的新聞事件 (story)，centroid 為字元 bigram 權重 (JSON)
+CREATE TABLE IF NOT EXISTS stories (
+    story_id TEXT PRIMARY KEY,
+    title TEXT,
+    size INTEGER DEFAULT 0,
+    created REAL,
+    updated REAL,
+    centroid TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_stories_updated ON stories(updated);
+
+CREATE TABLE IF NOT EXISTS story_members (
+    article_id TEXT PRIMARY KEY,
+    story_id TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_story_members_story ON story_members(story_id);
+
+-- 分類結果快取：content_hash 為正規化標題 + 摘要的雜湊，categories_key 為當時分類清單的雜湊
+CREATE TABLE IF NOT EXISTS classification_cache (
+    content_hash TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    categories_key TEXT NOT NULL,
+    last_used REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_classification_cache_used ON classification_cache(last_used);
+
+-- 批次 pipeline 的檢查點：每次執行的狀態 (JSON) 與處理中的文章，程式重啟後可從中斷處繼續
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    run_id TEXT PRIMARY KEY,
+    topics TEXT,
+    status TEXT NOT NULL,          -- running / checkpointed / completed / failed / abandoned
+    state TEXT,
+    created REAL,
+    updated REAL,
+    owner TEXT,                    -- 執行中的行程；owner 的 heartbeat 逾時後其他行程才能接手續跑
+    heartbeat REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_status ON pipeline_runs(status);
+
+CREATE TABLE IF NOT EXISTS pipeline_run_articles (
+    run_id TEXT NOT NULL,
+    article_id TEXT NOT NULL,
+    position INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, article_id)
+);
+
+-- 因執行時限到期而未完成分類或排名的文章，下一次執行時接手處理
+CREATE TABLE IF NOT EXISTS pending_articles (
+    canonical_url TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    added REAL
+);
+
+-- pipeline 工作佇列：API 寫入執行請求，獨立的 worker 行程 (scheduler/daily_scheduler.py) 領取並執行
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,            -- topics / pipeline
+    payload TEXT,
+    dedupe_key TEXT UNIQUE,        -- 同一鍵只會排入一次 (例如每日排程)
+    status TEXT NOT NULL,          -- queued / running / done / failed / interrupted
+    attempts INTEGER DEFAULT 0,
+    worker TEXT,
+    run_id TEXT,                   -- 對應的 pipeline_runs 執行；重新排入的工作從其檢查點續跑
+    result TEXT,
+    error TEXT,
+    created REAL,
+    started REAL,
+    heartbeat REAL,                -- worker 定期更新，逾時 (JOB_LEASE_SECONDS) 即視為 worker 已中止
+    finished REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_status ON pipeline_jobs(status, created);
@@ -1,62 +1,30 @@
 import uvicorn
 import asyncio
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import pytz
 from datetime import datetime
+from typing import List, Optional
 
 # 核心元件
-from core.a2a_bus import A2ABus
-from core.mcp_registry import MCPRegistry
-from core.llm_client import LLMClient
+from core.http_client import get_http_client
+from core.executors import ExecutorSaturated, executor_stats, get_executor, shutdown_executors
+from core.job_queue import get_job_queue
+from core.process_pool import get_process_pool, process_pool_stats, shutdown_process_pool
+from core.system import create_agents
 from core import config
 
-# Agents
-from agents.commander_agent import CommanderAgent
-from agents.crawler_agent import CrawlerAgent
-# from agents.summarizer_agent import SummarizerAgent
-from agents.classifier_agent import ClassifierAgent
-from agents.ranker_agent import RankerAgent
-from agents.storage_agent import StorageAgent
-
 # --- 1. 初始化應用程式與核心服務 ---
 app = FastAPI(title="Multi-Agent News System", version="1.0")
 templates = Jinja2Templates(directory="templates")
 
-# 初始化核心服務
-llm_client = LLMClient(model=config.LLM_MODEL, api_key=config.GEMINI_API_KEY)
-a2a_bus = A2ABus()
-mcp_registry = MCPRegistry()
+# queue 模式下 pipeline 由獨立的 worker 行程執行，API 行程只需要讀取新聞的 StorageAgent
+QUEUED = config.PIPELINE_EXECUTION == "queue"
 
 # --- 2. 實例化並註冊所有 Agents ---
-print("[System] Initializing and registering agents...")
-
-# 實例化所有 agent
-commander_agent = CommanderAgent(a2a_bus)
-crawler_agent = CrawlerAgent(a2a_bus, llm_client)
-classifier_agent = ClassifierAgent(llm_client)
-ranker_agent = RankerAgent(llm_client)
-storage_agent = StorageAgent(storage_path="data/news_storage.json")
-
-# 修正：使用 Agent 內部呼叫時的 'snake_case' 名稱進行註冊
-# 這些名稱必須與 agent 程式碼中 a2a_bus.send() 裡的接收者名稱完全匹配
-agents_to_register = {
-    "commander_agent": commander_agent,
-    "crawler_agent": crawler_agent,
-    "classifier_agent": classifier_agent,
-    "ranker_agent": ranker_agent,
-    "storage_agent": storage_agent
-}
-
-# 註冊到 A2A Bus 和 MCP Registry
-for name, agent_instance in agents_to_register.items():
-    a2a_bus.register(name, agent_instance)
-    mcp_registry.register(name, agent_instance)
-    print(f"- Agent '{name}' registered.")
-
-print("[System] All agents are ready.")
+a2a_bus, mcp_registry = create_agents(pipeline=not QUEUED)
 
 # --- 3. 定義 API 端點 ---
 @app.get("/", response_class=HTMLResponse)
@@ -66,24 +34,81 @@ async def read_root(request: Request):
     """
     return templates.TemplateResponse("index.html", {"request": request})
 
+def start_in_background(kind: str, payload: dict) -> Optional[str]:
+    """
+    queue 模式：把執行請求寫入工作佇列，交給 worker 行程，回傳 job_id。
+    inline 模式：在 pipeline 執行緒池中背景執行一次 pipeline，不佔用 asyncio 預設執行緒池；排隊已滿時回傳 429。
+    """
+    if QUEUED:
+        job_id = get_job_queue().enqueue(kind, payload)
+        print(f"[API] Queued {kind} job {job_id} for the pipeline workers.")
+        return job_id
+
+    commander = mcp_registry.get("commander_agent")
+    if not commander:
+        raise HTTPException(status_code=500, detail="CommanderAgent not found.")
+    if kind == "pipeline":
+        pipeline, args = commander.start_pipeline, (payload["topic"],)
+    else:
+        pipeline, args = commander.run_topics, (payload["topics"],)
+    try:
+        future = get_executor("pipeline").submit(pipeline, *args)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    def report_failure(done):
+        if not done.cancelled() and done.exception() is not None:
+            print(f"[API] Background pipeline run failed: {done.exception()}")
+    future.add_done_callback(report_failure)
+    return None
+
 @app.post("/api/run-pipeline", status_code=202)
 async def run_pipeline(topic: str = "科技"):
     """
     手動觸發一次完整的新聞處理流程。
     """
     print(f"[API] Manual pipeline run triggered for topic: '{topic}'")
-    commander = mcp_registry.get("commander_agent")
-    if not commander:
-        raise HTTPException(status_code=500, detail="CommanderAgent not found.")
-    
+
     # Since the pipeline can be long-running, run it in the background
-    asyncio.create_task(asyncio.to_thread(commander.start_pipeline, topic))
-    return {"status": "success", "message": f"Pipeline started for topic '{topic}'."}
+    job_id = start_in_background("pipeline", {"topic": topic})
+    return {"status": "success", "message": f"Pipeline started for topic '{topic}'.", "job_id": job_id}
+
+@app.post("/api/run-topics", status_code=202)
+async def run_topics(topics: Optional[List[str]] = Query(None)):
+    """
+    一次處理多個主題：所有主題同時爬取，跨主題去重後一起分類、排名與儲存。
+    未指定 topics 時使用 config.SCHEDULER_TOPICS。
+    """
+    topics = topics or config.SCHEDULER_TOPICS
+    print(f"[API] Multi-topic pipeline run triggered for topics: {topics}")
+
+    job_id = start_in_background("topics", {"topics": topics})
+    return {"status": "success", "message": f"Pipeline started for {len(topics)} topics.", "topics": topics,
+            "job_id": job_id}
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """
+    列出工作佇列 (queue 模式) 中各狀態的工作數與最近的工作。
+    """
+    queue = get_job_queue()
+    return {"status": "success", "counts": queue.counts(), "jobs": queue.recent()}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    查詢一個 pipeline 工作的狀態與結果。
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return {"status": "success", "job": job}
 
 @app.get("/api/news")
-async def get_news(sort_by: str = "latest"):
+async def get_news(sort_by: str = "latest", group_by: Optional[str] = None, topic: Optional[str] = None):
     """
     從儲存中獲取新聞列表 (latest 或 popular)。
+    group_by=story 時，每個新聞事件只回傳一篇代表文章；指定 topic 時只回傳該主題的文章。
     """
     storage = mcp_registry.get("storage_agent")
     if not storage:
@@ -92,7 +117,13 @@ async def get_news(sort_by: str = "latest"):
     if sort_by not in ["latest", "popular"]:
         raise HTTPException(status_code=400, detail="Invalid sort_by parameter. Use 'latest' or 'popular'.")
 
-    news_list = await storage.get_sorted(sort_by=sort_by)
+    if group_by not in [None, "story"]:
+        raise HTTPException(status_code=400, detail="Invalid group_by parameter. Use 'story' or omit it.")
+
+    if group_by == "story":
+        news_list = await storage.get_stories(sort_by=sort_by, topic=topic)
+    else:
+        news_list = await storage.get_sorted(sort_by=sort_by, topic=topic)
     
     # Format the timestamp for each article
     for article in news_list:
@@ -108,6 +139,30 @@ async def list_registered_agents():
     """
     return {"status": "success", "agents": mcp_registry.list_agents()}
 
+@app.get("/api/classifier/stats")
+async def classifier_stats():
+    """
+    回傳分類器統計：本地模型直接回答的次數與省下的 LLM 呼叫數。
+    """
+    classifier = mcp_registry.get("classifier_agent")
+    if not classifier:
+        raise HTTPException(status_code=500, detail="ClassifierAgent not found.")
+    return {"status": "success", "classifier": classifier.report()}
+
+@app.get("/api/system/http-pool")
+async def http_pool_stats():
+    """
+    回傳共用 HTTP 連線池與各主機的請求統計，用於調整連線設定。
+    """
+    return {"status": "success", "http": get_http_client().stats()}
+
+@app.get("/api/system/executors")
+async def executors_stats():
+    """
+    回傳各具名執行緒池 (pipeline、llm、http、cpu) 的執行緒與排隊統計，以及行程池 (若啟用) 的工作統計。
+    """
+    return {"status": "success", "executors": executor_stats(), "process_pool": process_pool_stats()}
+
 # --- 4. 設定排程任務 ---
 async def scheduled_news_pipeline_job():
     """
@@ -116,10 +171,10 @@ async def scheduled_news_pipeline_job():
     print(f"[Scheduler] Triggering scheduled news pipeline job...")
     commander = mcp_registry.get("commander_agent")
     try:
-        default_topic = "人工智慧"
-        # Run the synchronous pipeline function in a separate thread
-        await asyncio.to_thread(commander.start_pipeline, default_topic)
-        print(f"[Scheduler] Successfully completed job for topic '{default_topic}'.")
+        topics = config.SCHEDULER_TOPICS
+        # Run the synchronous pipeline on the pipeline executor; all topics share one run.
+        await get_executor("pipeline").run(commander.run_topics, topics)
+        print(f"[Scheduler] Successfully completed job for topics {topics}.")
     except Exception as e:
         print(f"[Scheduler] Error during scheduled job: {e}")
 
@@ -132,17 +187,50 @@ async def startup_event():
     應用程式啟動時執行的任務。
     """
     print("[System] Application starting up...")
+    if QUEUED:
+        # 排程與 pipeline 都在 worker 行程 (scheduler/daily_scheduler.py) 中執行
+        print("[System] Pipeline runs are queued for the worker processes.")
+        return
+    # 行程池的工作行程以 fork 建立，須在其他執行緒啟動前先建立
+    process_pool = get_process_pool()
+    if process_pool:
+        process_pool.start()
     scheduler.add_job(
         scheduled_news_pipeline_job, 
         "cron", 
         hour=config.SCHEDULER_HOUR, 
         minute=config.SCHEDULER_MINUTE
     )
+    # 定期更新本行程執行中 pipeline 的 heartbeat，其他行程才不會把它們當成中斷的執行接手
+    scheduler.add_job(mcp_registry.get("commander_agent").heartbeat_runs, "interval", seconds=config.RUN_HEARTBEAT_SECONDS)
+    # 其他行程中止後，其執行要等 heartbeat 逾時才能接手，因此定期檢查
+    scheduler.add_job(resume_interrupted_runs, "interval", seconds=config.RUN_RESUME_CHECK_SECONDS)
     scheduler.start()
     print(f"[Scheduler] Job scheduled daily at {config.SCHEDULER_HOUR}:{config.SCHEDULER_MINUTE:02d} ({config.SCHEDULER_TIMEZONE}).")
     
+    asyncio.create_task(initial_pipeline_runs())
+
+
+async def resume_interrupted_runs():
+    """
+    續跑被中斷、且已無存活行程持有的 pipeline（依 checkpoint）。
+    """
+    commander = mcp_registry.get("commander_agent")
+    try:
+        resumed = await get_executor("pipeline").run(commander.resume_incomplete_runs)
+        if resumed:
+            print(f"[System] Resumed {len(resumed)} interrupted pipeline runs.")
+    except Exception as e:
+        print(f"[System] Error while resuming interrupted runs: {e}")
+
+
+async def initial_pipeline_runs():
+    """
+    先續跑上次被中斷的 pipeline（依 checkpoint），再執行一次啟動時的例行任務。
+    """
+    await resume_interrupted_runs()
     print("[System] Performing an initial run on startup...")
-    asyncio.create_task(scheduled_news_pipeline_job())
+    await scheduled_news_pipeline_job()
 
 
 @app.on_event("shutdown")
@@ -151,7 +239,14 @@ async def shutdown_event():
     應用程式關閉時執行的任務。
     """
     print("[System] Application shutting down...")
-    scheduler.shutdown()
+    if scheduler.running:
+        scheduler.shutdown()
+    # 儲存執行中 pipeline 的進度，下次啟動時續跑。
+    commander = mcp_registry.get("commander_agent")
+    if commander:
+        commander.checkpoint_active_runs()
+    shutdown_executors()
+    shutdown_process_pool()
     print("[Scheduler] Shutdown complete.")
 
 # --- 6. 執行應用程式 ---
@@ -1,16 +1,200 @@
 # scheduler/daily_scheduler.py
+"""
+Standalone pipeline worker: runs the daily schedule and the pipeline jobs that API processes
+queue in the state database (config.PIPELINE_EXECUTION = "queue"). API replicas then only
+read news and workers do all the writing, and the two scale independently:
+
+    PIPELINE_EXECUTION=queue python main.py     # API server(s)
+    python -m scheduler.daily_scheduler         # worker(s)
+"""
+import asyncio
+import os
+import signal
+import socket
+import uuid
+from datetime import datetime
+from typing import Dict
+
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import datetime
-from core.a2a_bus import bus
+
+from core import config
+from core.executors import get_executor, shutdown_executors
+from core.job_queue import JobQueue, get_job_queue
+from core.process_pool import get_process_pool, shutdown_process_pool
+from core.system import create_agents
+
+
+def _now() -> datetime:
+    return datetime.now(pytz.timezone(config.SCHEDULER_TIMEZONE))
+
 
 async def run_daily_job():
+    """Queues the day's run. Every worker schedules it; the dedupe key lets only the first one through."""
     print(f"[Scheduler] Triggered at {datetime.now()}")
-    await bus.call("commander", {})
+    job_id = get_job_queue().enqueue("topics", {"topics": config.SCHEDULER_TOPICS},
+                                     dedupe_key=f"daily:{_now().date().isoformat()}")
+    if job_id:
+        print(f"[Scheduler] Queued daily job {job_id}.")
+    else:
+        print("[Scheduler] Today's job was already queued by another worker.")
+
 
-def start_scheduler():
-    tz = pytz.timezone("Asia/Taipei")
+def start_scheduler(worker: "PipelineWorker") -> AsyncIOScheduler:
+    tz = pytz.timezone(config.SCHEDULER_TIMEZONE)
     scheduler = AsyncIOScheduler(timezone=tz)
-    scheduler.add_job(run_daily_job, "cron", hour=9, minute=0)
+    scheduler.add_job(run_daily_job, "cron", hour=config.SCHEDULER_HOUR, minute=config.SCHEDULER_MINUTE)
+    scheduler.add_job(worker.renew_leases, "interval", seconds=config.JOB_HEARTBEAT_SECONDS)
+    scheduler.add_job(worker.commander.heartbeat_runs, "interval", seconds=config.RUN_HEARTBEAT_SECONDS)
+    # A crashed process's runs become claimable only once its heartbeat lapses, so this repeats.
+    scheduler.add_job(resume_interrupted_runs, "interval", seconds=config.RUN_RESUME_CHECK_SECONDS,
+                      args=[worker.commander], id="resume_interrupted_runs")
     scheduler.start()
-    print("[Scheduler] Running daily at 9:00 AM Taipei time")
+    print(f"[Scheduler] Running daily at {config.SCHEDULER_HOUR}:{config.SCHEDULER_MINUTE:02d} ({config.SCHEDULER_TIMEZONE}).")
+    return scheduler
+
+
+class PipelineWorker:
+    """
+    Claims jobs from the queue and runs them on the pipeline executor, as many at a time as that
+    executor has threads, renewing their leases while they run. On shutdown, runs in flight are
+    checkpointed, so the next worker start resumes them. A job requeued because its worker died
+    resumes that worker's run from its checkpoint.
+    """
+    def __init__(self, commander, queue: JobQueue):
+        self.commander = commander
+        self.queue = queue
+        # Host and pid repeat across container restarts; the random part keeps a restarted
+        # worker from renewing the leases of the jobs its predecessor left running.
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.slots = config.EXECUTORS["pipeline"]["workers"]
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+
+    def _run_job(self, job: Dict) -> Dict:
+        payload = job["payload"]
+        if job["kind"] == "pipeline":
+            topics = [payload["topic"]]
+        elif job["kind"] == "topics":
+            topics = payload["topics"]
+        else:
+            raise ValueError(f"Unknown job kind '{job['kind']}'")
+        if job["run_id"]:
+            # The job's last worker stopped renewing its lease. If it got as far as finishing the
+            # run, only the job's outcome is missing; otherwise the run continues from its checkpoint.
+            if self.commander.run_status(job["run_id"]) == "completed":
+                return {"status": "completed", "run_id": job["run_id"]}
+            result = self.commander.resume_run(job["run_id"])
+            if result is not None:
+                return result
+            print(f"[Worker] Run {job['run_id']} of job {job['job_id']} can no longer be resumed; starting a new run.")
+        # The run is recorded on the job before it starts, so a worker taking the job over can resume it.
+        run_id = self.commander.create_run(topics)
+        if run_id:
+            self.queue.set_run(job["job_id"], self.worker_id, run_id)
+        return self.commander.run_topics(topics, run_id=run_id)
+
+    async def _execute(self, job: Dict):
+        job_id = job["job_id"]
+        print(f"[Worker] Running {job['kind']} job {job_id} (attempt {job['attempts']}).")
+        try:
+            result = await get_executor("pipeline").run(self._run_job, job)
+        except Exception as e:
+            print(f"[Worker] Job {job_id} failed: {e}")
+            self.queue.fail(job_id, self.worker_id, str(e))
+        else:
+            status = result.get("status") if isinstance(result, dict) else None
+            if status == "interrupted":
+                self.queue.interrupt(job_id, self.worker_id)
+            elif status == "failed":
+                self.queue.fail(job_id, self.worker_id, result.get("reason") or "pipeline run failed")
+            else:
+                self.queue.complete(job_id, self.worker_id, result)
+            print(f"[Worker] Job {job_id} finished: {result}")
+        finally:
+            self._running.pop(job_id, None)
+
+    async def serve(self):
+        """Claims and starts jobs until stop() is called."""
+        print(f"[Worker] {self.worker_id} is consuming pipeline jobs ({self.slots} at a time).")
+        while not self._stopping.is_set():
+            job = None
+            if len(self._running) < self.slots:
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=config.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._running[job["job_id"]] = asyncio.create_task(self._execute(job))
+
+    async def renew_leases(self):
+        """Renews the leases of the jobs in flight; without this they would be requeued after JOB_LEASE_SECONDS."""
+        if not self._running:
+            return
+        try:
+            await asyncio.to_thread(self.queue.renew, self.worker_id)
+        except Exception as e:
+            print(f"[Worker] Could not renew job leases: {e}")
+
+    def stop(self):
+        self._stopping.set()
+
+    async def drain(self, grace: float = config.JOB_SHUTDOWN_GRACE_SECONDS):
+        """
+        Checkpoints the runs in flight and waits up to `grace` seconds for them to stop after
+        their current batches. Jobs still running then are marked interrupted.
+        """
+        if not self._running:
+            return
+        self.commander.checkpoint_active_runs()
+        await asyncio.wait(list(self._running.values()), timeout=grace)
+        for job_id in list(self._running):
+            self.queue.interrupt(job_id, self.worker_id)
+
+
+async def resume_interrupted_runs(commander):
+    try:
+        resumed = await get_executor("pipeline").run(commander.resume_incomplete_runs)
+        if resumed:
+            print(f"[Worker] Resumed {len(resumed)} interrupted pipeline runs.")
+    except Exception as e:
+        print(f"[Worker] Error while resuming interrupted runs: {e}")
+
+
+async def main():
+    _, mcp_registry = create_agents()
+    # The process pool forks its workers, so it starts before other threads do.
+    process_pool = get_process_pool()
+    if process_pool:
+        process_pool.start()
+
+    commander = mcp_registry.get("commander_agent")
+    queue = get_job_queue()
+    worker = PipelineWorker(commander, queue)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    scheduler = start_scheduler(worker)
+    resume = asyncio.create_task(resume_interrupted_runs(commander))
+    # Like the API server's startup run; workers started within the same hour share one.
+    queue.enqueue("topics", {"topics": config.SCHEDULER_TOPICS}, dedupe_key=f"startup:{_now():%Y-%m-%dT%H}")
+    try:
+        await worker.serve()
+    finally:
+        print("[Worker] Shutting down...")
+        # The scheduler keeps renewing leases and run heartbeats while runs in flight checkpoint,
+        # but starts no more resumes.
+        scheduler.remove_job("resume_interrupted_runs")
+        await worker.drain()
+        commander.checkpoint_active_runs()
+        scheduler.shutdown()
+        shutdown_executors()
+        shutdown_process_pool()
+        print("[Worker] Shutdown complete.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
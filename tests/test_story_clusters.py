@@ -0,0 +1,23 @@
+import time
+
+from core.news_article import NewsArticle
+from core.story_clusters import _MAX_CENTROID_TERMS, StoryClusterer
+
+
+def _article(i: int, summary: str) -> NewsArticle:
+    return NewsArticle(title=f"測試新聞標題 第{i}則", url=f"https://example.com/{i}", summary=summary)
+
+
+def test_trimmed_terms_are_not_left_posted_after_eviction(tmp_path):
+    clusterer = StoryClusterer(db_path=str(tmp_path / "state.db"))
+    # Enough distinct bigrams that the story's centroid is trimmed.
+    summary = "".join(chr(0x4E00 + i) for i in range(600))
+    article = _article(1, summary)
+    clusterer.assign([article])
+    story = clusterer._stories[article.story_id]
+    assert len(story.centroid) == _MAX_CENTROID_TERMS
+    assert all(article.story_id not in ids or term in story.centroid for term, ids in clusterer._postings.items())
+
+    story.updated = time.time() - clusterer.window_seconds - 1
+    clusterer.assign([_article(2, summary)])
+    assert not any(ids - set(clusterer._stories) for ids in clusterer._postings.values())